@@ -1,81 +1,141 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify
-from pymongo import MongoClient
+from flask import Blueprint, Flask, current_app, g, render_template, request, redirect, url_for, session, jsonify
 from bson.objectid import ObjectId
-from werkzeug.security import generate_password_hash, check_password_hash
-from config import MONGO_URI
+from werkzeug.local import LocalProxy
+import config
+from db import Mongo, ensure_indexes
+from ingest import (
+    backfill_incidents, drop_retried_reports, insert_reports, normalize_batch, normalize_position, with_read_defaults,
+)
+from clustering import PRIMARY_FILTER, assign_groups, group_filter, group_id_for, settle_groups
+from priority import assign_priority, backfill_priority, hospital_origin, top_k
+from tiles import MAX_ZOOM, ClusterCache, parse_bbox
+from positions import PositionBuffer
+from passwords import HashPool, HashPoolBusy, LoginThrottle
+from assets import Assets, build_assets
+from logging_setup import configure_logging
+from serialization import init_json
+from compression import Compressor
+from metrics import MetricsRegistry
+from traffic import TrafficRecorder
+import versions
+from services import reconcile_ambulance
+from collections import Counter
 from datetime import datetime
+import hashlib
+import hmac
+import json
+import logging
+import math
+import os
 import re
+import time
 from io import BytesIO
 from flask import send_file
+from werkzeug.middleware.proxy_fix import ProxyFix
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 
-app = Flask(__name__)
-app.secret_key = "supersecretkey"
+try:
+    import requests
+except ImportError:  # optional dependency: OSM hospital search falls back to the local database
+    requests = None
+
+bp = Blueprint("main", __name__)
+
+logger = logging.getLogger("swiftaid.app")
+search_logger = logging.getLogger("swiftaid.search")
 
 # -----------------------------
 # MONGO DB CONNECTION
 # -----------------------------
-try:
-    client = MongoClient(MONGO_URI)
-    db = client['SwiftAid']
-    hospital_users = db['hospital_user']
-    incidents_collection = db['incidents']
-    case_status_collection = db['case_status']
-    ambulances_collection = db['ambulances']
-    resolved_cases_collection = db['resolved_cases']
+def get_db():
+    """Database handle of the current app; the client is created lazily on first use."""
+    return current_app.extensions["mongo"].db
+
+
+hospital_users = LocalProxy(lambda: get_db()['hospital_user'])
+incidents_collection = LocalProxy(lambda: get_db()['incidents'])
+case_status_collection = LocalProxy(lambda: get_db()['case_status'])
+ambulances_collection = LocalProxy(lambda: get_db()['ambulances'])
+resolved_cases_collection = LocalProxy(lambda: get_db()['resolved_cases'])
+
+
+def case_id_for(incident_id):
+    """Duplicate reports of one crash share a single case, keyed by the group id."""
+    return group_id_for(incidents_collection, incident_id)
+
+# -----------------------------
+# HEALTH CHECKS
+# -----------------------------
+@bp.route("/healthz")
+def healthz():
+    """Liveness: the process is up (never touches MongoDB)."""
+    return jsonify({"status": "ok"})
+
 
-    print("✅ Connected to MongoDB successfully")
-except Exception as e:
-    print("❌ MongoDB Connection Failed:", e)
+@bp.route("/readyz")
+def readyz():
+    """Readiness: MongoDB answers a ping within the server selection timeout."""
+    if current_app.extensions["mongo"].ping():
+        return jsonify({"status": "ready"})
+    return jsonify({"status": "unavailable"}), 503
 
 # -----------------------------
 # DASHBOARD
 # -----------------------------
-@app.route("/")
+def latest_incident_id():
+    """Newest incident id; the mobile app inserts incidents without bumping any stamp."""
+    latest = incidents_collection.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    return str(latest["_id"]) if latest else ""
+
+
+def dashboard_validators():
+    """
+    Extra ETag parts for the dashboard: the template fingerprint (a deploy changes the page),
+    the newest incident id and the current minute (the capped age bonus re-ranks waiting cases).
+    """
+    return [current_app.extensions["template_fingerprint"], latest_incident_id(), int(time.time() // 60)]
+
+
+@bp.route("/")
+@versions.conditional(incidents=True, extra=dashboard_validators)
 def dashboard():
     if "email" not in session:
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
 
     user = hospital_users.find_one({"email": session["email"]})
     if not user:
-        return redirect(url_for("logout"))
+        return redirect(url_for("main.logout"))
 
     hospital_name = session.get("hospital_name")
 
     try:
-        incidents = list(incidents_collection.find())
         all_statuses = list(case_status_collection.find())
-
-        for inc in incidents:
-            inc["_id"] = str(inc["_id"])
-            inc["lat"] = inc.get("lat", 14.4663)
-            inc["lng"] = inc.get("lng", 75.9219)
-            inc["user_email"] = inc.get("user_email", "Unknown")
-            inc["speed"] = inc.get("speed", 0)
-            inc["accel_mag"] = inc.get("accel_mag", 0)
-            inc["created_at"] = inc.get("metadata", {}).get("created_at", "N/A")
-
-        for cs in all_statuses:
-            cs["_id"] = str(cs["_id"])
-            if "incident_id" in cs:
-                cs["incident_id"] = str(cs["incident_id"])
-
-        accepted_cases_global = {cs["incident_id"]: cs for cs in all_statuses if cs["status"] == "accepted"}
+        # One row per open incident group, most urgent first; cases accepted elsewhere leave the
+        # queue, while this hospital's own stay on it, however far down they rank, with their
+        # resolve/assign controls
+        accepted = [cs for cs in all_statuses if cs["status"] == "accepted"]
+        own_accepted = [str(cs["incident_id"]) for cs in accepted if cs.get("hospital_name") == hospital_name]
+        incidents = top_k(incidents_collection, config.PRIORITY_FEED_SIZE, origin=hospital_origin(user),
+                          include=own_accepted, exclude=[str(cs["incident_id"]) for cs in accepted])
+
+        accepted_cases_global = {str(cs["incident_id"]): cs for cs in all_statuses if cs["status"] == "accepted"}
         rejected_cases_by_hospital = {
-            cs["incident_id"]: cs for cs in all_statuses
+            str(cs["incident_id"]): cs for cs in all_statuses
             if cs["status"] == "rejected" and cs.get("hospital_name") == hospital_name
         }
 
         for inc in incidents:
-            if inc["_id"] in accepted_cases_global:
-                inc["status_info"] = accepted_cases_global[inc["_id"]]
-            elif inc["_id"] in rejected_cases_by_hospital:
+            with_read_defaults(inc)
+            incident_id = str(inc["_id"])
+            if incident_id in accepted_cases_global:
+                inc["status_info"] = accepted_cases_global[incident_id]
+            elif incident_id in rejected_cases_by_hospital:
                 inc["status_info"] = {"status": "rejected", "hospital_name": hospital_name}
             else:
                 inc["status_info"] = None
 
-        active_cases = len(incidents)
+        active_cases = incidents_collection.count_documents(PRIMARY_FILTER)
         accepted_cases = case_status_collection.count_documents({
             "status": "accepted",
             "hospital_name": hospital_name
@@ -90,9 +150,10 @@ def dashboard():
             "hospital_name": hospital_name
         })
 
-    except Exception as e:
-        print("❌ Error fetching incidents:", e)
+    except Exception:
+        logger.exception("Error fetching incidents")
         incidents, active_cases, accepted_cases = [], 0, 0
+        available_ambulances, resolved_cases = 0, 0
 
     return render_template(
         "dashboard.html",
@@ -108,7 +169,7 @@ def dashboard():
 # -----------------------------
 # UPDATE CASE STATUS
 # -----------------------------
-@app.route("/update_case_status", methods=["POST"])
+@bp.route("/update_case_status", methods=["POST"])
 def update_case_status():
     """
     Update case status:
@@ -126,6 +187,8 @@ def update_case_status():
     if not incident_id or status not in ["accepted", "rejected"]:
         return jsonify({"success": False, "message": "Invalid input"}), 400
 
+    incident_id = case_id_for(incident_id)
+
     user_email = session["email"]
     hospital = hospital_users.find_one({"email": user_email})
     hospital_name = hospital.get("hospital_name", "Unknown Hospital")
@@ -146,6 +209,7 @@ def update_case_status():
                 },
                 upsert=True
             )
+            versions.bump([hospital_name], incidents=True)
             return jsonify({"success": True, "message": "Case accepted successfully!"})
 
         elif status == "rejected":
@@ -163,23 +227,24 @@ def update_case_status():
                     {"$set": {"status": "available", "current_incident_id": None}}
                 )
 
+            versions.bump([hospital_name, linked_ambulance and linked_ambulance.get("hospital_name")], incidents=True)
             if delete_result.deleted_count > 0:
                 msg = "Case rejected and ambulance (if any) released."
             else:
                 msg = "Case was not previously accepted."
             return jsonify({"success": True, "message": msg})
 
-    except Exception as e:
-        print("❌ update_case_status error:", e)
+    except Exception:
+        logger.exception("update_case_status error")
         return jsonify({"success": False, "message": "Server error"}), 500
 
 # -----------------------------
 # CASE DETAIL PAGE
 # -----------------------------
-@app.route("/case/<incident_id>")
+@bp.route("/case/<incident_id>")
 def case_detail(incident_id):
     if "email" not in session:
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
 
     hospital_name = session.get("hospital_name")
 
@@ -187,16 +252,9 @@ def case_detail(incident_id):
         incident = incidents_collection.find_one({"_id": ObjectId(incident_id)})
         if not incident:
             return "Case not found", 404
+        with_read_defaults(incident)
 
-        incident["_id"] = str(incident["_id"])
-        incident["lat"] = incident.get("lat", 14.4663)
-        incident["lng"] = incident.get("lng", 75.9219)
-        incident["user_email"] = incident.get("user_email", "Unknown")
-        incident["speed"] = incident.get("speed", 0)
-        incident["accel_mag"] = incident.get("accel_mag", 0)
-        incident["created_at"] = incident.get("metadata", {}).get("created_at", "N/A")
-
-        status = case_status_collection.find_one({"incident_id": str(incident["_id"])})
+        status = case_status_collection.find_one({"incident_id": incident.get("group_id", incident_id)})
         if status:
             incident["status"] = status["status"]
             incident["accepted_by"] = status.get("hospital_name")
@@ -204,8 +262,8 @@ def case_detail(incident_id):
             incident["status"] = "available"
             incident["accepted_by"] = None
 
-    except Exception as e:
-        print("❌ Error fetching case detail:", e)
+    except Exception:
+        logger.exception("Error fetching case detail", extra={"incident_id": incident_id})
         return "Error loading case details", 500
 
     return render_template(
@@ -217,7 +275,8 @@ def case_detail(incident_id):
 # -----------------------------
 # AMBULANCE ROUTES
 # -----------------------------
-@app.route("/ambulances", methods=["GET"])
+@bp.route("/ambulances", methods=["GET"])
+@versions.conditional(positions=True)
 def get_ambulances():
     """Fetch all ambulances belonging to the logged-in hospital and auto-sync their availability."""
     if "email" not in session:
@@ -226,52 +285,88 @@ def get_ambulances():
     hospital_name = session.get("hospital_name")
     ambs = list(ambulances_collection.find({"hospital_name": hospital_name}))
 
+    # 🧠 Automatically sync status and mark assigned_case flag
+    reconciled = False
     for amb in ambs:
-        amb_id = amb.get("_id")
-        current_incident = amb.get("current_incident_id")
-
-        # 🧠 Automatically sync status and mark assigned_case flag
-        if not current_incident or current_incident in ("", None):
-            # No case → mark available
-            if amb.get("status") != "available":
-                ambulances_collection.update_one(
-                    {"_id": amb_id},
-                    {"$set": {"status": "available", "current_incident_id": None}}
-                )
-            amb["status"] = "available"
-            amb["assigned_case"] = False
-        else:
-            # Has assigned case → ensure on-duty and lock it
-            if amb.get("status") != "on-duty":
-                ambulances_collection.update_one(
-                    {"_id": amb_id},
-                    {"$set": {"status": "on-duty"}}
-                )
-            amb["status"] = "on-duty"
-            amb["assigned_case"] = True
-
-        amb["_id"] = str(amb["_id"])
+        update = reconcile_ambulance(amb)
+        if update:
+            ambulances_collection.update_one({"_id": amb["_id"]}, {"$set": update})
+            reconciled = True
+    if reconciled:
+        # The dashboard's available-ambulance count is validated by the hospital stamp
+        versions.bump([hospital_name])
 
     return jsonify({"success": True, "ambulances": ambs})
 
 # -----------------------------
 # GET RESOLVED CASES
 # -----------------------------
-@app.route("/resolved_cases", methods=["GET"])
+@bp.route("/resolved_cases", methods=["GET"])
+@versions.conditional()
 def get_resolved_cases():
     if "email" not in session:
         return jsonify({"success": False, "message": "Not logged in"}), 403
 
     hospital_name = session.get("hospital_name")
     cases = list(resolved_cases_collection.find({"hospital_name": hospital_name}))
-    for c in cases:
-        c["_id"] = str(c["_id"])
     return jsonify({"success": True, "resolved_cases": cases})
 
+# -----------------------------
+# PRIORITY QUEUE
+# -----------------------------
+TOP_INCIDENT_FIELDS = ("_id", "user_email", "lat", "lng", "speed", "accel_mag", "metadata", "report_count", "score")
+
+
+@bp.route("/api/incidents/top", methods=["GET"])
+def top_incidents():
+    """The k most urgent incidents nobody has accepted, for the logged-in hospital (?k=, default 10, max 500)."""
+    if "email" not in session:
+        return jsonify({"success": False, "message": "Not logged in"}), 403
+
+    k = request.args.get("k", 10, type=int)
+    if k is None or not 1 <= k <= 500:
+        return jsonify({"success": False, "message": "k must be between 1 and 500"}), 400
+
+    user = hospital_users.find_one({"email": session["email"]}, {"lat": 1, "lng": 1})
+    accepted = case_status_collection.find({"status": "accepted"}, {"incident_id": 1})
+    incidents = top_k(incidents_collection, k, origin=hospital_origin(user),
+                      exclude=[str(cs["incident_id"]) for cs in accepted])
+    return jsonify({
+        "success": True,
+        "incidents": [{field: inc[field] for field in TOP_INCIDENT_FIELDS if field in inc} for inc in incidents],
+    })
+
+# -----------------------------
+# MAP CLUSTERS
+# -----------------------------
+def map_validators():
+    """
+    Extra ETag parts for the clusters: the version of the snapshot that will be served (kept on g
+    for the view; it may lag the incidents stamp briefly, see tiles.py) and the viewport.
+    """
+    version = (versions.read_stamps([versions.GLOBAL_SCOPE])[versions.GLOBAL_SCOPE], latest_incident_id())
+    g.map_snapshot = current_app.extensions["map_clusters"].snapshot(incidents_collection, version)
+    return [repr(g.map_snapshot.version), request.query_string.decode()]
+
+
+@bp.route("/api/map/clusters", methods=["GET"])
+@versions.conditional(extra=map_validators)
+def map_clusters():
+    """Clustered incident markers for ?bbox=west,south,east,north&zoom=."""
+    if "email" not in session:
+        return jsonify({"success": False, "message": "Not logged in"}), 403
+
+    bbox = parse_bbox(request.args.get("bbox"))
+    zoom = request.args.get("zoom", type=int)
+    if bbox is None or zoom is None or not 0 <= zoom <= MAX_ZOOM:
+        return jsonify({"success": False, "message": "bbox and zoom are required"}), 400
+
+    return jsonify({"success": True, "zoom": zoom, "clusters": g.map_snapshot.clusters(bbox, zoom)})
+
 # -----------------------------
 # DELETE RESOLVED CASE
 # -----------------------------
-@app.route("/delete_resolved_case", methods=["POST"])
+@bp.route("/delete_resolved_case", methods=["POST"])
 def delete_resolved_case():
     if "email" not in session:
         return jsonify({"success": False, "message": "Not logged in"}), 403
@@ -286,19 +381,20 @@ def delete_resolved_case():
         result = resolved_cases_collection.delete_one({"_id": ObjectId(case_id)})
         if result.deleted_count == 0:
             return jsonify({"success": False, "message": "Case not found"}), 404
+        versions.bump([session.get("hospital_name")])
         return jsonify({"success": True, "message": "Resolved case deleted successfully!"})
-    except Exception as e:
-        print("❌ delete_resolved_case error:", e)
+    except Exception:
+        logger.exception("delete_resolved_case error", extra={"case_id": case_id})
         return jsonify({"success": False, "message": "Error deleting resolved case"}), 500
 
 # -----------------------------
 # DOWNLOAD RESOLVED CASE AS PDF
 # -----------------------------
-@app.route("/download_resolved_case/<case_id>", methods=["GET"])
+@bp.route("/download_resolved_case/<case_id>", methods=["GET"])
 def download_resolved_case(case_id):
     """Generate a professional PDF report for resolved case."""
     if "email" not in session:
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
 
     case = resolved_cases_collection.find_one({"_id": ObjectId(case_id)})
     if not case:
@@ -360,7 +456,7 @@ def download_resolved_case(case_id):
 # -----------------------------
 # Add Ambulance
 # -----------------------------
-@app.route("/add_ambulance", methods=["POST"])
+@bp.route("/add_ambulance", methods=["POST"])
 def add_ambulance():
     if "email" not in session:
         return jsonify({"success": False, "message": "Not logged in"}), 403
@@ -390,6 +486,7 @@ def add_ambulance():
         "status": "available",
         "hospital_name": hospital_name
     })
+    versions.bump([hospital_name])
     return jsonify({"success": True, "message": "Ambulance added successfully"})
 
 from bson import ObjectId
@@ -397,7 +494,7 @@ from bson import ObjectId
 # -----------------------------
 # UPDATE_AMBULANCE_STATUS ROUTES
 # -----------------------------
-@app.route("/update_ambulance_status", methods=["POST"])
+@bp.route("/update_ambulance_status", methods=["POST"])
 def update_ambulance_status():
     """Toggle ambulance status (available ↔ on-duty), skip if assigned (locked)."""
     if "email" not in session:
@@ -437,21 +534,22 @@ def update_ambulance_status():
             {"_id": amb_obj_id},
             {"$set": update_data}
         )
+        versions.bump([ambulance.get("hospital_name")])
 
-        print(f"✅ Ambulance {amb_id} updated to {new_status}")
+        logger.info("Ambulance status updated", extra={"ambulance_id": amb_id, "status": new_status})
         return jsonify({
             "success": True,
             "message": f"Ambulance marked as {new_status.capitalize()} successfully!"
         })
 
-    except Exception as e:
-        print("❌ update_ambulance_status error:", e)
+    except Exception:
+        logger.exception("update_ambulance_status error")
         return jsonify({"success": False, "message": "Server error"}), 500
 
 # -----------------------------
 # ASSIGN AMBULANCE TO A CASE
 # -----------------------------
-@app.route("/assign_ambulance", methods=["POST"])
+@bp.route("/assign_ambulance", methods=["POST"])
 def assign_ambulance():
     if "email" not in session:
         return jsonify({"success": False, "message": "Not logged in"}), 403
@@ -464,6 +562,8 @@ def assign_ambulance():
     if not incident_id or not ambulance_id:
         return jsonify({"success": False, "message": "Missing incident_id or ambulance_id"}), 400
 
+    incident_id = case_id_for(incident_id)
+
     try:
         # 1️⃣ Check if the incident is already accepted by another hospital
         existing_accept = case_status_collection.find_one({"incident_id": incident_id, "status": "accepted"})
@@ -490,17 +590,18 @@ def assign_ambulance():
                 "current_incident_id": incident_id  # ✅ store which incident it handles
             }}
         )
+        versions.bump([hospital_name], incidents=True)
 
         return jsonify({"success": True, "message": "Ambulance assigned and incident linked successfully!"})
 
-    except Exception as e:
-        print("❌ assign_ambulance error:", e)
+    except Exception:
+        logger.exception("assign_ambulance error")
         return jsonify({"success": False, "message": "Server error while assigning ambulance"}), 500
 
 # -----------------------------
 # DELETE CASE STATUS (Revert Decision)
 # -----------------------------
-@app.route("/delete_case_status", methods=["POST"])
+@bp.route("/delete_case_status", methods=["POST"])
 def delete_case_status():
     """Allow hospital to revert (delete) their case decision."""
     if "email" not in session:
@@ -513,6 +614,8 @@ def delete_case_status():
     if not incident_id:
         return jsonify({"success": False, "message": "Missing incident_id"}), 400
 
+    incident_id = case_id_for(incident_id)
+
     try:
         # 🧹 Remove only this hospital's decision
         result = case_status_collection.delete_one({
@@ -531,18 +634,19 @@ def delete_case_status():
                 {"$set": {"status": "available", "current_incident_id": None}}
             )
 
+        versions.bump([hospital_name, linked_ambulance and linked_ambulance.get("hospital_name")], incidents=True)
         return jsonify({"success": True, "message": "Case decision removed successfully"})
 
 
-    except Exception as e:
-        print("❌ delete_case_status error:", e)
+    except Exception:
+        logger.exception("delete_case_status error")
         return jsonify({"success": False, "message": "Server error while deleting case status"}), 500
 
 
 # -----------------------------
 # DELETE INCIDENT (CLEAR CASE)
 # -----------------------------
-@app.route("/delete_incident", methods=["POST"])
+@bp.route("/delete_incident", methods=["POST"])
 def delete_incident():
     """Completely delete an incident and related data, and free any linked ambulance. Store it as resolved."""
     if "email" not in session:
@@ -555,8 +659,10 @@ def delete_incident():
     if not incident_id:
         return jsonify({"success": False, "message": "Missing incident_id"}), 400
 
+    incident_id = case_id_for(incident_id)
+
     try:
-        # 🩺 1️⃣ Get the incident before deleting
+        # 🩺 1️⃣ Get the incident (group primary) before deleting
         incident = incidents_collection.find_one({"_id": ObjectId(incident_id)})
         if not incident:
             return jsonify({"success": False, "message": "Incident not found"}), 404
@@ -578,8 +684,8 @@ def delete_incident():
             "resolved_at": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
         })
 
-        # 🗑️ 4️⃣ Delete from incidents & case_status
-        incidents_collection.delete_one({"_id": ObjectId(incident_id)})
+        # 🗑️ 4️⃣ Delete every report of the group & its case_status
+        incidents_collection.delete_many(group_filter(incident_id))
         case_status_collection.delete_many({"incident_id": incident_id})
 
         # 🚐 5️⃣ Release ambulance if linked
@@ -589,30 +695,158 @@ def delete_incident():
                 {"$set": {"status": "available", "current_incident_id": None}}
             )
 
-        print(f"✅ Case {incident_id} marked as resolved and removed.")
+        versions.bump([hospital_name, linked_ambulance and linked_ambulance.get("hospital_name")], incidents=True)
+        logger.info("Case marked as resolved and removed", extra={"incident_id": incident_id})
         return jsonify({"success": True, "message": "Case cleared and marked as resolved."})
 
-    except Exception as e:
-        print("❌ delete_incident error:", e)
+    except Exception:
+        logger.exception("delete_incident error")
         return jsonify({"success": False, "message": "Server error while deleting incident"}), 500
 
 
+# -----------------------------
+# INCIDENT INGESTION (mobile / IoT clients)
+# -----------------------------
+def valid_ingest_key(key):
+    # compare_digest only accepts ASCII str, so compare the encoded bytes (headers may carry anything)
+    key = key.encode()
+    return bool(key) and any(hmac.compare_digest(key, allowed.encode()) for allowed in config.INGEST_API_KEYS)
+
+
+@bp.route("/api/incidents/batch", methods=["POST"])
+def ingest_incidents():
+    """
+    Validate, normalize and insert a batch of crash reports in one unordered insert_many.
+    Body: {"incidents": [...]} (or a bare list). Invalid or duplicate reports are reported per index.
+    """
+    if not valid_ingest_key(request.headers.get("X-API-Key", "")):
+        return jsonify({"success": False, "message": "Invalid API key"}), 403
+
+    data = request.get_json(silent=True)
+    reports = data.get("incidents") if isinstance(data, dict) else data
+    if not isinstance(reports, list) or not reports:
+        return jsonify({"success": False, "message": "Expected a non-empty list of incidents"}), 400
+    if len(reports) > config.INGEST_MAX_BATCH:
+        return jsonify({"success": False, "message": f"At most {config.INGEST_MAX_BATCH} incidents per batch"}), 413
+
+    docs, positions, failures = normalize_batch(reports)
+    inserted = {}
+    if docs:
+        try:
+            # Retries are dropped before clustering so they never become group primaries
+            docs, positions, retried = drop_retried_reports(incidents_collection, docs, positions)
+            failures.extend(retried)
+            assign_groups(incidents_collection, docs)
+            assign_priority(docs)
+            inserted, rejected = insert_reports(incidents_collection, docs, positions)
+            failures.extend(rejected)
+            orphans = set(settle_groups(incidents_collection, docs, set(inserted.values())))
+            for index in [index for index, _id in inserted.items() if _id in orphans]:
+                del inserted[index]
+                failures.append({"index": index, "errors": ["group primary was not stored, resend"]})
+        except Exception:
+            logger.exception("ingest_incidents error")
+            return jsonify({"success": False, "message": "Server error while storing incidents"}), 500
+
+    if inserted:
+        versions.bump(incidents=True)
+
+    failures.sort(key=lambda f: f["index"])
+    status = 200 if not failures else (207 if inserted else 400)
+    return jsonify({
+        "success": not failures,
+        "inserted": len(inserted),
+        "ids": {str(index): str(_id) for index, _id in sorted(inserted.items())},
+        "errors": failures,
+    }), status
+
+
+# -----------------------------
+# AMBULANCE GPS (tracking devices)
+# -----------------------------
+@bp.route("/api/ambulances/positions", methods=["POST"])
+def ingest_positions():
+    """
+    Buffer GPS pings; they reach MongoDB in the next write-behind flush (see positions.py).
+    Body: {"positions": [...]} (or a bare list, or one ping). Unknown ambulances and invalid pings are reported per index.
+    """
+    if not valid_ingest_key(request.headers.get("X-API-Key", "")):
+        return jsonify({"success": False, "message": "Invalid API key"}), 403
+
+    data = request.get_json(silent=True)
+    pings = data.get("positions", [data]) if isinstance(data, dict) else data
+    if not isinstance(pings, list) or not pings:
+        return jsonify({"success": False, "message": "Expected a non-empty list of positions"}), 400
+    if len(pings) > config.INGEST_MAX_BATCH:
+        return jsonify({"success": False, "message": f"At most {config.INGEST_MAX_BATCH} positions per batch"}), 413
+
+    buffer = current_app.extensions["positions"]
+    valid, failures = [], []
+    for index, raw in enumerate(pings):
+        ambulance_id, position, errors = normalize_position(raw)
+        if errors:
+            failures.append({"index": index, "errors": errors})
+        else:
+            valid.append((index, ambulance_id, position))
+
+    try:
+        known = buffer.known_ambulances([ambulance_id for _, ambulance_id, _ in valid])
+    except Exception:
+        logger.exception("ingest_positions error")
+        return jsonify({"success": False, "message": "Server error while looking up ambulances"}), 500
+
+    accepted = 0
+    for index, ambulance_id, position in valid:
+        if ambulance_id not in known:
+            failures.append({"index": index, "errors": ["unknown ambulance_id"]})
+        elif buffer.record(ambulance_id, position):
+            accepted += 1
+
+    failures.sort(key=lambda f: f["index"])
+    status = 200 if not failures else (207 if len(failures) < len(pings) else 400)
+    return jsonify({"success": not failures, "accepted": accepted, "errors": failures}), status
+
+
 # -----------------------------
 # LOGIN
 # -----------------------------
-@app.route("/login", methods=["GET", "POST"])
+def throttled(template, wait):
+    """429 page for a client that has run out of login attempts."""
+    seconds = math.ceil(wait)
+    page = render_template(template, error=f"Too many attempts. Try again in {seconds} seconds.")
+    return page, 429, {"Retry-After": str(seconds)}
+
+
+@bp.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
         email = request.form["email"].strip().lower()
         password = request.form["password"]
 
+        wait = current_app.extensions["login_throttle"].check(request.remote_addr, email)
+        if wait:
+            return throttled("login.html", wait)
+
         user = hospital_users.find_one({"email": email})
-        if user and check_password_hash(user["password"], password):
+        hash_pool = current_app.extensions["hash_pool"]
+        try:
+            valid, needs_rehash = hash_pool.verify(user and user.get("password"), password)
+        except HashPoolBusy:
+            logger.warning("Password hashing saturated; login refused")
+            return render_template("login.html", error="Server busy, please try again shortly"), 503
+        if valid and needs_rehash:
+            # Hashing parameters changed since this hash was stored; the upgrade can wait for a quieter login
+            try:
+                hospital_users.update_one({"_id": user["_id"]}, {"$set": {"password": hash_pool.hash(password)}})
+            except HashPoolBusy:
+                logger.warning("Password hashing saturated; rehash for %s deferred", email)
+
+        if valid:
             session["hospital_name"] = user["hospital_name"]
             session["email"] = user["email"]
             session["phone"] = user.get("phone", "")
             session["location"] = user.get("location", "")
-            return redirect(url_for("dashboard"))
+            return redirect(url_for("main.dashboard"))
         else:
             return render_template("login.html", error="Invalid email or password")
 
@@ -622,7 +856,16 @@ def login():
 # -----------------------------
 # REGISTER
 # -----------------------------
-@app.route("/register", methods=["GET", "POST"])
+def form_coordinates(form):
+    """(lat, lng) from a form's lat/lng fields, or None when either is missing or out of range."""
+    lat = form.get("lat", type=float)
+    lng = form.get("lng", type=float)
+    if lat is None or lng is None or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+@bp.route("/register", methods=["GET", "POST"])
 def register():
     if request.method == "POST":
         hospital_name = request.form["hospital_name"].strip()
@@ -639,15 +882,26 @@ def register():
         if hospital_users.find_one({"email": email}):
             return render_template("register.html", error="Email already registered")
 
-        hashed_pw = generate_password_hash(password)
+        wait = current_app.extensions["login_throttle"].by_ip.take(request.remote_addr or "-")
+        if wait:
+            return throttled("register.html", wait)
+        try:
+            hashed_pw = current_app.extensions["hash_pool"].hash(password)
+        except HashPoolBusy:
+            return render_template("register.html", error="Server busy, please try again shortly"), 503
 
-        hospital_users.insert_one({
+        new_user = {
             "hospital_name": hospital_name,
             "email": email,
             "phone": phone,
             "location": location,
             "password": hashed_pw
-        })
+        }
+        # Coordinates come from the selected search result; they drive the distance term of the priority score
+        coordinates = form_coordinates(request.form)
+        if coordinates:
+            new_user["lat"], new_user["lng"] = coordinates
+        hospital_users.insert_one(new_user)
 
         return render_template("login.html", success="Registration successful! Please login.")
 
@@ -657,16 +911,16 @@ def register():
 # -----------------------------
 # LOGOUT
 # -----------------------------
-@app.route("/logout")
+@bp.route("/logout")
 def logout():
     session.clear()
-    return redirect(url_for("login"))
+    return redirect(url_for("main.login"))
 
 
 # -----------------------------
 # UPDATE PROFILE (AJAX)
 # -----------------------------
-@app.route("/update_profile", methods=["POST"])
+@bp.route("/update_profile", methods=["POST"])
 def update_profile():
     if "email" not in session:
         return jsonify({"success": False, "message": "Not logged in"}), 403
@@ -677,22 +931,42 @@ def update_profile():
         "phone": request.form.get("phone"),
         "location": request.form.get("location"),
     }
+    if request.form.get("lat") or request.form.get("lng"):
+        coordinates = form_coordinates(request.form)
+        if not coordinates:
+            return jsonify({"success": False, "message": "Latitude and longitude must both be valid"}), 400
+        updated_data["lat"], updated_data["lng"] = coordinates
 
     try:
         hospital_users.update_one({"email": email}, {"$set": updated_data})
+        versions.bump([session.get("hospital_name"), updated_data["hospital_name"]])
         session["hospital_name"] = updated_data["hospital_name"]
         session["phone"] = updated_data["phone"]
         session["location"] = updated_data["location"]
 
         return jsonify({"success": True, "message": "Profile updated successfully!"})
-    except Exception as e:
-        print("❌ Profile update error:", e)
+    except Exception:
+        logger.exception("Profile update error")
         return jsonify({"success": False, "message": "Error updating profile"}), 500
 
 
+# City centre coordinates for the local database; close enough for the capped distance term of the priority score
+KARNATAKA_CITY_COORDINATES = {
+    "Bangalore": (12.9716, 77.5946),
+    "Mysore": (12.2958, 76.6394),
+    "Hubli": (15.3647, 75.1240),
+    "Mangalore": (12.9141, 74.8560),
+    "Davanagere": (14.4644, 75.9218),
+    "Shimoga": (13.9299, 75.5681),
+    "Bellary": (15.1394, 76.9214),
+    "Belgaum": (15.8497, 74.4977),
+    "Gulbarga": (17.3297, 76.8343),
+}
+
+
 def get_karnataka_hospital_database():
     """Comprehensive Karnataka hospitals including Davanagere that OSM might miss"""
-    return [
+    hospitals = [
         # Critical hospitals that OSM often misses
         {"name": "Manipal Hospital", "location": "Bangalore, Karnataka", "city": "Bangalore", "state": "Karnataka",
          "type": "private"},
@@ -783,6 +1057,9 @@ def get_karnataka_hospital_database():
         {"name": "District Hospital", "location": "Gulbarga, Karnataka", "city": "Gulbarga", "state": "Karnataka",
          "type": "government"},
     ]
+    for hospital in hospitals:
+        hospital["lat"], hospital["lng"] = KARNATAKA_CITY_COORDINATES[hospital["city"]]
+    return hospitals
 
 
 def search_hospitals_hybrid(query, limit=10):
@@ -797,7 +1074,7 @@ def search_hospitals_hybrid(query, limit=10):
         osm_hospitals = search_hospitals_nominatim(query, limit=limit)
         all_hospitals.extend(osm_hospitals)
 
-        print(f"🔍 OSM found {len(osm_hospitals)} hospitals for query: '{query}'")
+        search_logger.debug("OSM found %d hospitals for query %r", len(osm_hospitals), query)
 
         # 2. If OSM returns few results, add local Karnataka hospitals
         if len(all_hospitals) < 5:
@@ -810,11 +1087,13 @@ def search_hospitals_hybrid(query, limit=10):
                     all_hospitals.append({
                         'name': hospital['name'],
                         'location': hospital['location'],
-                        'type': 'karnataka'  # Mark as from local Karnataka DB
+                        'type': 'karnataka',  # Mark as from local Karnataka DB
+                        'lat': hospital['lat'],
+                        'lng': hospital['lng']
                     })
                     existing_names.add(hospital['name'].lower())
 
-            print(f"🏥 Local DB added {len(local_hospitals)} Karnataka hospitals")
+            search_logger.debug("Local DB added %d Karnataka hospitals", len(local_hospitals))
 
         # 3. Remove duplicates and limit results
         unique_hospitals = []
@@ -826,8 +1105,8 @@ def search_hospitals_hybrid(query, limit=10):
 
         return unique_hospitals[:limit]
 
-    except Exception as e:
-        print(f"❌ Hybrid search error: {e}")
+    except Exception:
+        search_logger.exception("Hybrid search error")
         # Fallback to local only
         return search_karnataka_hospitals_local(query, limit)
 
@@ -866,8 +1145,10 @@ def search_hospitals_nominatim(query, country="India", limit=8):
     """
     Improved OpenStreetMap search with better hospital detection for Karnataka
     """
+    if requests is None:
+        return []
     try:
-        headers = {'User-Agent': USER_AGENT}
+        headers = {'User-Agent': config.NOMINATIM_USER_AGENT}
 
         # Smarter search query focused on Karnataka
         params = {
@@ -878,7 +1159,7 @@ def search_hospitals_nominatim(query, country="India", limit=8):
             'countrycodes': 'in'
         }
 
-        response = requests.get(NOMINATIM_API_URL, params=params, headers=headers, timeout=8)
+        response = requests.get(config.NOMINATIM_API_URL, params=params, headers=headers, timeout=8)
 
         if response.status_code == 200:
             results = response.json()
@@ -891,15 +1172,15 @@ def search_hospitals_nominatim(query, country="India", limit=8):
                         'name': hospital_name,
                         'location': extract_location(result),
                         'type': 'osm',
-                        'lat': result.get('lat'),
-                        'lon': result.get('lon')
+                        'lat': float(result['lat']) if result.get('lat') else None,
+                        'lng': float(result['lon']) if result.get('lon') else None
                     })
 
             return hospitals
         return []
 
-    except Exception as e:
-        print(f"❌ OSM search error: {e}")
+    except Exception:
+        search_logger.exception("OSM search error")
         return []
 
 
@@ -957,17 +1238,17 @@ def init_karnataka_hospital_cache():
         if hospitals_collection.count_documents({}) == 0:
             karnataka_hospitals = get_karnataka_hospital_database()
             hospitals_collection.insert_many(karnataka_hospitals)
-            print("✅ Karnataka hospital cache initialized with 35+ hospitals including Davanagere")
+            logger.info("Karnataka hospital cache initialized with 35+ hospitals including Davanagere")
         else:
-            print("✅ Hospital cache already exists")
-    except Exception as e:
-        print(f"❌ Error initializing hospital cache: {e}")
+            logger.info("Hospital cache already exists")
+    except Exception:
+        logger.exception("Error initializing hospital cache")
 
 
 # -----------------------------
 # REAL-TIME HOSPITAL SEARCH API
 # -----------------------------
-@app.route("/api/hospitals/search", methods=["GET"])
+@bp.route("/api/hospitals/search", methods=["GET"])
 def search_hospitals_api():
     """
     Hybrid hospital search: OSM + Karnataka Local DB
@@ -993,7 +1274,9 @@ def search_hospitals_api():
             all_hospitals.append({
                 'name': hospital['hospital_name'],
                 'location': hospital.get('location', ''),
-                'type': 'registered'
+                'type': 'registered',
+                'lat': hospital.get('lat'),
+                'lng': hospital.get('lng')
             })
 
         # 2. Hybrid search (OSM + Local Karnataka)
@@ -1006,17 +1289,92 @@ def search_hospitals_api():
                 if hospital['name'].lower() not in existing_names:
                     all_hospitals.append(hospital)
 
-        print(
-            f"🎯 Total results: {len(all_hospitals)} (Registered: {len([h for h in all_hospitals if h.get('type') == 'registered'])}, OSM: {len([h for h in all_hospitals if h.get('type') == 'osm'])}, Karnataka: {len([h for h in all_hospitals if h.get('type') == 'karnataka'])})")
+        # The per-source summary costs a pass over the results: only build it when debug is on
+        if search_logger.isEnabledFor(logging.DEBUG):
+            sources = Counter(h.get('type') for h in all_hospitals)
+            search_logger.debug(
+                "Hospital search results",
+                extra={"query": query, "total": len(all_hospitals), "registered": sources['registered'],
+                       "osm": sources['osm'], "karnataka": sources['karnataka']},
+            )
 
         return jsonify({'hospitals': all_hospitals[:limit]})
 
-    except Exception as e:
-        print(f"❌ Hospital search error: {e}")
+    except Exception:
+        search_logger.exception("Hospital search error")
         # Ultimate fallback - local Karnataka only
         local_results = search_karnataka_hospitals_local(query, limit)
         return jsonify({'hospitals': local_results})
 
 
+# -----------------------------
+# APP FACTORY
+# -----------------------------
+def template_fingerprint(app):
+    """Hash of the templates and asset manifest, so a deploy that changes the markup or assets invalidates cached pages."""
+    digest = hashlib.sha1()
+    template_dir = os.path.join(app.root_path, app.template_folder)
+    for name in sorted(os.listdir(template_dir)):
+        with open(os.path.join(template_dir, name), "rb") as fh:
+            digest.update(fh.read())
+    digest.update(json.dumps(app.extensions["assets"].manifest, sort_keys=True).encode())
+    return digest.hexdigest()[:12]
+
+
+def create_app(mongo_client=None):
+    """
+    Build the Flask app.
+    Under gunicorn every worker calls this after fork, so each process owns its MongoClient.
+    Pass mongo_client (or set MONGO_URI=mongomock://) to run against a stand-in instead of Atlas.
+    Nothing here touches the network: the MongoClient is built on the first query.
+    """
+    configure_logging()
+
+    app = Flask(__name__)
+    app.secret_key = config.SECRET_KEY
+    if config.TRUSTED_PROXY_HOPS:
+        # Client address and scheme from the proxies' X-Forwarded-* headers (login throttling keys on it)
+        hops = config.TRUSTED_PROXY_HOPS
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+    init_json(app)
+
+    metrics = MetricsRegistry()
+    metrics.init_app(app)
+    TrafficRecorder().init_app(app)
+    Compressor().init_app(app)
+    app.extensions["mongo"] = Mongo(client=mongo_client, event_listeners=[metrics.command_listener])
+
+    Assets().init_app(app)
+    app.extensions["template_fingerprint"] = template_fingerprint(app)
+    app.extensions["map_clusters"] = ClusterCache()
+    PositionBuffer().init_app(app)
+    HashPool().init_app(app)
+    LoginThrottle().init_app(app)
+
+    app.register_blueprint(bp)
+
+    @app.cli.command("init-db")
+    def init_db_command():
+        """Create the MongoDB indexes."""
+        ensure_indexes(get_db())
+        print("Indexes created.")
+
+    @app.cli.command("backfill-incidents")
+    def backfill_incidents_command():
+        """Normalize incidents stored before ingestion validation existed."""
+        updated, skipped = backfill_incidents(incidents_collection)
+        print(f"Normalized {updated} incidents ({skipped} could not be repaired).")
+        print(f"Scored {backfill_priority(incidents_collection)} incidents.")
+
+    @app.cli.command("build-assets")
+    def build_assets_command():
+        """Minify, fingerprint and precompress static/ into static/dist (run at deploy)."""
+        manifest = build_assets(app.static_folder)
+        print(f"Built {len(manifest)} assets into {os.path.join(app.static_folder, 'dist')}.")
+
+    return app
+
+
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    # Development server only; production runs `gunicorn -c gunicorn.conf.py wsgi:app`
+    create_app().run(debug=config.DEBUG)
\ No newline at end of file
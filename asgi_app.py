@@ -0,0 +1,142 @@
+"""
+Asyncio (Quart + Motor) variant of the polling JSON endpoints.
+
+Dispatch screens poll /ambulances and /resolved_cases continuously; here each
+poll is a coroutine instead of a blocked worker thread, so one process can keep
+hundreds of them in flight. Business rules come from services.py, and the
+session cookie is the same itsdangerous cookie Flask issues, so a proxy can
+route these GET paths here while logins and mutations stay on wsgi:app.
+
+    hypercorn --workers 4 --bind 0.0.0.0:8001 asgi_app:app
+"""
+import functools
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from quart import Blueprint, Quart, current_app, jsonify, make_response, request, session
+
+import config
+import versions
+from compression import ETAG_SUFFIXES
+from db import client_options
+from serialization import init_json
+from services import reconcile_ambulance
+
+bp = Blueprint("async_api", __name__)
+
+
+def get_db():
+    return current_app.extensions["motor_db"]
+
+
+def conditional(positions=False):
+    """Async twin of versions.conditional: 304 from the hospital's version stamp without querying."""
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            if "email" not in session:
+                return await view(*args, **kwargs)
+
+            scopes = versions.bump_scopes([session.get("hospital_name")], positions=positions)
+            cursor = get_db()[versions.COLLECTION].find(versions.stamps_filter(scopes))
+            found = {doc["_id"]: doc.get("v", 0) for doc in await cursor.to_list(length=None)}
+            stamps = {scope: found.get(scope, 0) for scope in scopes}
+            tag = versions.make_etag(request.endpoint.rpartition(".")[2], stamps,
+                                     session["email"], session.get("hospital_name"))
+
+            if any(request.if_none_match.contains(tag + suffix) for suffix in ("",) + ETAG_SUFFIXES):
+                response = current_app.response_class("", status=304)
+            else:
+                response = await make_response(await view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(tag)
+            response.headers["Cache-Control"] = versions.CACHE_CONTROL
+            return response
+        return wrapper
+    return decorator
+
+
+# -----------------------------
+# HEALTH CHECKS
+# -----------------------------
+@bp.route("/healthz")
+async def healthz():
+    return jsonify({"status": "ok"})
+
+
+@bp.route("/readyz")
+async def readyz():
+    try:
+        await current_app.extensions["motor_client"].admin.command("ping")
+        return jsonify({"status": "ready"})
+    except Exception:
+        return jsonify({"status": "unavailable"}), 503
+
+
+# -----------------------------
+# AMBULANCE ROUTES
+# -----------------------------
+@bp.route("/ambulances", methods=["GET"])
+@conditional(positions=True)
+async def get_ambulances():
+    """Async twin of app.get_ambulances."""
+    if "email" not in session:
+        return jsonify({"success": False, "message": "Not logged in"}), 403
+
+    hospital_name = session.get("hospital_name")
+    ambulances = get_db()["ambulances"]
+    ambs = await ambulances.find({"hospital_name": hospital_name}).to_list(length=None)
+
+    reconciled = False
+    for amb in ambs:
+        update = reconcile_ambulance(amb)
+        if update:
+            await ambulances.update_one({"_id": amb["_id"]}, {"$set": update})
+            reconciled = True
+    if reconciled:
+        # The dashboard's available-ambulance count is validated by the hospital stamp
+        for scope in versions.bump_scopes([hospital_name]):
+            await get_db()[versions.COLLECTION].update_one({"_id": scope}, {"$inc": {"v": 1}}, upsert=True)
+
+    return jsonify({"success": True, "ambulances": ambs})
+
+
+# -----------------------------
+# GET RESOLVED CASES
+# -----------------------------
+@bp.route("/resolved_cases", methods=["GET"])
+@conditional()
+async def get_resolved_cases():
+    """Async twin of app.get_resolved_cases."""
+    if "email" not in session:
+        return jsonify({"success": False, "message": "Not logged in"}), 403
+
+    cursor = get_db()["resolved_cases"].find({"hospital_name": session.get("hospital_name")})
+    cases = await cursor.to_list(length=None)
+    return jsonify({"success": True, "resolved_cases": cases})
+
+
+# -----------------------------
+# APP FACTORY
+# -----------------------------
+def create_async_app(mongo_uri=None):
+    """Build the Quart app; the Motor client is created inside the serving event loop."""
+    app = Quart(__name__)
+    app.secret_key = config.SECRET_KEY
+    init_json(app)
+
+    @app.before_serving
+    async def open_mongo():
+        client = AsyncIOMotorClient(mongo_uri or config.MONGO_URI, **client_options())
+        app.extensions["motor_client"] = client
+        app.extensions["motor_db"] = client[config.MONGO_DB_NAME]
+
+    @app.after_serving
+    async def close_mongo():
+        app.extensions["motor_client"].close()
+
+    app.register_blueprint(bp)
+    return app
+
+
+app = create_async_app()
@@ -0,0 +1,161 @@
+"""
+Static asset build and fingerprinted serving.
+
+    flask --app wsgi build-assets
+
+Run at deploy time. It builds static/dist/ from everything under static/
+(Leaflet is vendored in static/vendor/leaflet, so pages load offline):
+
+    - CSS and JS are minified when rcssmin / rjsmin are installed (vendor
+      files ship minified and keep their licence headers untouched)
+    - url() references inside CSS are rewritten to the built names
+    - every file gets a content hash in its name (style.css → style.1a2b3c4d5e.css)
+    - text assets get .gz and (with brotli installed) .br siblings
+    - static/dist/manifest.json maps source paths to built ones
+
+Templates link assets with asset_url("css/style.css"). With a manifest the
+URL is /assets/<built name>: the precompressed variant the client accepts,
+cached as immutable for a year, because a changed file gets a new name.
+Without one (a checkout that was never built) asset_url falls back to the
+plain /static/ file.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+from flask import abort, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+try:
+    import rcssmin
+    import rjsmin
+except ImportError:  # optional dependency
+    rcssmin = rjsmin = None
+
+BUILD_DIR = "dist"
+MANIFEST = "manifest.json"
+ASSET_EXTENSIONS = frozenset({".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".ico", ".woff", ".woff2"})
+TEXT_EXTENSIONS = frozenset({".css", ".js", ".svg"})
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def _sources(static_dir):
+    for root, dirs, files in os.walk(static_dir):
+        if root == static_dir and BUILD_DIR in dirs:
+            dirs.remove(BUILD_DIR)
+        for name in files:
+            if os.path.splitext(name)[1].lower() in ASSET_EXTENSIONS:
+                yield os.path.relpath(os.path.join(root, name), static_dir).replace(os.sep, "/")
+
+
+def _rewrite_css_urls(path, text, manifest):
+    def replace(match):
+        quote, url = match.groups()
+        if re.match(r"^([a-z]+:|/|#)", url):
+            return match.group(0)
+        target = posixpath.normpath(posixpath.join(posixpath.dirname(path), re.split(r"[?#]", url)[0]))
+        if target not in manifest:
+            return match.group(0)
+        return f"url({quote}{posixpath.relpath(manifest[target], posixpath.dirname(path))}{quote})"
+    return CSS_URL.sub(replace, text)
+
+
+def _transform(path, data, manifest):
+    extension = os.path.splitext(path)[1].lower()
+    vendored = path.startswith("vendor/")
+    if extension == ".css":
+        text = _rewrite_css_urls(path, data.decode("utf-8"), manifest)
+        if rcssmin is not None and not vendored:
+            text = rcssmin.cssmin(text)
+        return text.encode("utf-8")
+    if extension == ".js" and rjsmin is not None and not vendored:
+        return rjsmin.jsmin(data.decode("utf-8")).encode("utf-8")
+    return data
+
+
+def build_assets(static_dir):
+    """Rebuild static/dist from static/. Returns the manifest {source path: built path}."""
+    out_dir = os.path.join(static_dir, BUILD_DIR)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    manifest = {}
+    # CSS last, so its url() references can point at the already built images
+    for path in sorted(_sources(static_dir), key=lambda p: (p.endswith(".css"), p)):
+        with open(os.path.join(static_dir, path), "rb") as fh:
+            data = _transform(path, fh.read(), manifest)
+        root, extension = os.path.splitext(path)
+        built = f"{root}.{hashlib.sha256(data).hexdigest()[:10]}{extension}"
+        target = os.path.join(out_dir, built)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as fh:
+            fh.write(data)
+        if extension.lower() in TEXT_EXTENSIONS:
+            with open(target + ".gz", "wb") as fh:
+                fh.write(gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(target + ".br", "wb") as fh:
+                    fh.write(brotli.compress(data, quality=11))
+        manifest[path] = built
+    with open(os.path.join(out_dir, MANIFEST), "w") as fh:
+        json.dump(manifest, fh, indent=1, sort_keys=True)
+    return manifest
+
+
+class Assets:
+    def __init__(self):
+        self.directory = None
+        self.manifest = {}
+        self._encodings = {}
+
+    def init_app(self, app):
+        self.directory = os.path.join(app.static_folder, BUILD_DIR)
+        self.load()
+        app.extensions["assets"] = self
+        app.add_url_rule("/assets/<path:filename>", "assets", self.serve)
+        app.jinja_env.globals["asset_url"] = self.url
+
+    def load(self):
+        """Read the manifest written by build_assets (none yet → plain /static/ URLs)."""
+        try:
+            with open(os.path.join(self.directory, MANIFEST)) as fh:
+                self.manifest = json.load(fh)
+        except FileNotFoundError:
+            self.manifest = {}
+        self._encodings = {
+            built: [(encoding, suffix) for encoding, suffix in PRECOMPRESSED
+                    if os.path.exists(os.path.join(self.directory, built + suffix))]
+            for built in self.manifest.values()
+        }
+
+    def url(self, path):
+        built = self.manifest.get(path)
+        if built is None:
+            return url_for("static", filename=path)
+        return url_for("assets", filename=built)
+
+    def serve(self, filename):
+        if filename not in self._encodings:
+            abort(404)
+        for encoding, suffix in self._encodings[filename]:
+            if request.accept_encodings[encoding] > 0:
+                break
+        else:
+            encoding, suffix = None, ""
+        response = send_from_directory(self.directory, filename + suffix,
+                                       mimetype=mimetypes.guess_type(filename)[0])
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        if self._encodings[filename]:
+            response.vary.add("Accept-Encoding")
+        response.headers["Cache-Control"] = CACHE_CONTROL
+        return response
@@ -0,0 +1,85 @@
+"""
+Concurrent-client throughput and p99 latency: sync Flask (gunicorn gthread)
+vs the asyncio variant (Quart + Motor under hypercorn) on the polling endpoints.
+
+Motor needs a real server, so this runs against a local mongod:
+    python -m bench.async_vs_sync --mongo-uri mongodb://localhost:27017 --clients 10 50 200
+"""
+import argparse
+import json
+import sys
+
+from bench.common import (
+    login_cookie, make_stand_in_client, print_table, run_sessions, seed_hospital, start_server, BENCH_HOSPITAL,
+)
+
+SYNC_PORT = 8101
+ASYNC_PORT = 8102
+
+
+def seed_polling_data(db, ambulances, resolved):
+    db["ambulances"].delete_many({"hospital_name": BENCH_HOSPITAL})
+    db["resolved_cases"].delete_many({"hospital_name": BENCH_HOSPITAL})
+    db["ambulances"].insert_many([
+        {"vehicle_number": f"KA-17-{i:04d}", "driver_name": "Bench Driver", "phone": "9999999999",
+         "status": "available", "hospital_name": BENCH_HOSPITAL, "current_incident_id": None}
+        for i in range(ambulances)
+    ])
+    db["resolved_cases"].insert_many([
+        {"incident_id": f"{i:024x}", "user_email": "user@swiftaid.test", "hospital_name": BENCH_HOSPITAL,
+         "driver_name": "Bench Driver", "vehicle_number": "KA-17-0001", "resolved_at": "2025-01-01 00:00:00"}
+        for i in range(resolved)
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", required=True, help="local mongod, e.g. mongodb://localhost:27017")
+    parser.add_argument("--clients", type=int, nargs="+", default=[10, 50, 200], help="concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per run")
+    parser.add_argument("--workers", type=int, default=2, help="processes per server")
+    parser.add_argument("--threads", type=int, default=4, help="gunicorn threads per worker")
+    parser.add_argument("--ambulances", type=int, default=25)
+    parser.add_argument("--resolved", type=int, default=100)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    db = make_stand_in_client(args.mongo_uri)["SwiftAid"]
+    seed_hospital(db)
+    seed_polling_data(db, args.ambulances, args.resolved)
+
+    env = {"MONGO_URI": args.mongo_uri, "WEB_CONCURRENCY": str(args.workers),
+           "GUNICORN_THREADS": str(args.threads), "BIND": f"127.0.0.1:{SYNC_PORT}"}
+    servers = {
+        "sync": (f"http://127.0.0.1:{SYNC_PORT}",
+                 [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"]),
+        "async": (f"http://127.0.0.1:{ASYNC_PORT}",
+                  [sys.executable, "-m", "hypercorn", "--workers", str(args.workers),
+                   "--bind", f"127.0.0.1:{ASYNC_PORT}", "asgi_app:app"]),
+    }
+    procs = [start_server(cmd, url, env) for url, cmd in servers.values()]
+
+    try:
+        # Both apps read the same Flask session cookie
+        cookie = login_cookie(servers["sync"][0])
+
+        rows = []
+        for path in ("/ambulances", "/resolved_cases"):
+            for clients in args.clients:
+                for name, (url, _) in servers.items():
+                    stats = run_sessions(url, clients, args.duration,
+                                         lambda s, i: s.request("GET", path)[:2], cookie=cookie)
+                    rows.append({"app": name, "path": path, "clients": clients, **stats.summary()})
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait()
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows, ["path", "clients", "app", "requests", "rps", "p50_ms", "p99_ms", "errors"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Sustained incident ingestion rate through POST /api/incidents/batch.
+
+    python -m bench.bench_ingest --batch-sizes 1 50 500 --clients 4
+    python -m bench.bench_ingest --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+
+import config
+from bench.common import make_stand_in_client, print_table, run_sessions, serve_in_thread
+from bench.datagen import SwiftAidDataGenerator
+
+BENCH_KEY = "bench-ingest-key"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", help="local mongod (default: mongomock)")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 50, 500])
+    parser.add_argument("--clients", type=int, default=4, help="concurrent uploaders")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per batch size")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    from app import create_app
+
+    config.INGEST_API_KEYS = [BENCH_KEY]
+    config.INGEST_MAX_BATCH = max(config.INGEST_MAX_BATCH, *args.batch_sizes)
+    client = make_stand_in_client(args.mongo_uri)
+    client["SwiftAid"]["incidents"].drop()
+    base_url, server = serve_in_thread(create_app(mongo_client=client))
+
+    gen = SwiftAidDataGenerator(incidents=10_000, seed=args.seed)
+    rng = random.Random(args.seed)
+    pool = []
+    started = datetime.utcnow()
+    for i in range(10_000):
+        report = gen.incident(i)
+        # Recent timestamps: ingestion rejects reports dated outside INGEST_MAX_REPORT_AGE_S
+        created_at = started - timedelta(seconds=rng.randrange(3600))
+        report["metadata"] = {"created_at": created_at.isoformat() + "Z"}
+        pool.append(report)
+
+    rows = []
+    for size in args.batch_sizes:
+        payloads = [json.dumps({"incidents": rng.sample(pool, size)}) for _ in range(64)]
+
+        def upload(sess, i):
+            status, body, _ = sess.request("POST", "/api/incidents/batch", body=payloads[i % len(payloads)],
+                                           headers={"Content-Type": "application/json", "X-API-Key": BENCH_KEY})
+            return status, body
+
+        stats = run_sessions(base_url, args.clients, args.duration, upload, login=False)
+        summary = stats.summary()
+        rows.append({"batch": size, "batches_s": summary["rps"], "reports_s": round(summary["rps"] * size),
+                     "p50_ms": summary["p50_ms"], "p99_ms": summary["p99_ms"], "errors": summary["errors"]})
+
+    server.shutdown()
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows, ["batch", "batches_s", "reports_s", "p50_ms", "p99_ms", "errors"])
+
+
+if __name__ == "__main__":
+    main()
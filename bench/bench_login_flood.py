@@ -0,0 +1,98 @@
+"""
+Dashboard latency while a credential-stuffing flood hits POST /login.
+
+    python -m bench.bench_login_flood --dashboards 4 --attackers 16 --duration 10
+
+Scenarios, each against a fresh app on the same seeded data:
+
+    idle            dashboards only
+    unbounded       as many hashing threads as attackers, no throttling (like hashing inline)
+    pool            PASSWORD_HASH_WORKERS threads with a bounded backlog, no throttling
+    pool+throttle   the defaults: bounded pool behind per-IP / per-email token buckets
+"""
+import argparse
+import json
+import threading
+import uuid
+
+import config
+from bench.common import login_cookie, make_stand_in_client, print_table, run_sessions, serve_in_thread
+from bench.datagen import SwiftAidDataGenerator
+
+UNLIMITED = 10 ** 9
+
+
+def scenarios(attackers):
+    return [
+        ("idle", {}, False),
+        ("unbounded", {"PASSWORD_HASH_WORKERS": attackers, "PASSWORD_HASH_QUEUE": attackers,
+                       "LOGIN_IP_BURST": UNLIMITED, "LOGIN_EMAIL_BURST": UNLIMITED}, True),
+        ("pool", {"LOGIN_IP_BURST": UNLIMITED, "LOGIN_EMAIL_BURST": UNLIMITED}, True),
+        ("pool+throttle", {}, True),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", help="local mongod (default: mongomock)")
+    parser.add_argument("--incidents", type=int, default=200)
+    parser.add_argument("--dashboards", type=int, default=4, help="polling dispatch screens")
+    parser.add_argument("--attackers", type=int, default=16, help="concurrent login flooders")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    from app import create_app
+
+    client = make_stand_in_client(args.mongo_uri)
+    SwiftAidDataGenerator(incidents=args.incidents, seed=args.seed).populate(client["SwiftAid"])
+    defaults = {name: getattr(config, name) for name in
+                ("PASSWORD_HASH_WORKERS", "PASSWORD_HASH_QUEUE", "LOGIN_IP_BURST", "LOGIN_EMAIL_BURST")}
+
+    rows = []
+    for name, overrides, flood in scenarios(args.attackers):
+        for key, value in {**defaults, **overrides}.items():
+            setattr(config, key, value)
+        base_url, server = serve_in_thread(create_app(mongo_client=client))
+
+        def stuff(sess, i):
+            form = {"email": f"{uuid.uuid4().hex[:10]}@example.test", "password": uuid.uuid4().hex}
+            status, body, _ = sess.request("POST", "/login", form=form)
+            return status, body
+
+        def poll(sess, i):
+            status, body, _ = sess.request("GET", "/")
+            return status, body
+
+        # Log the dashboards in before the flood drains this IP's login bucket
+        cookie = login_cookie(base_url)
+
+        results = {}
+        attack = None
+        if flood:
+            attack = threading.Thread(target=lambda: results.update(
+                flood=run_sessions(base_url, args.attackers, args.duration, stuff, login=False)))
+            attack.start()
+        results["dash"] = run_sessions(base_url, args.dashboards, args.duration, poll, cookie=cookie)
+        if attack is not None:
+            attack.join()
+        server.shutdown()
+
+        dash = results["dash"].summary()
+        row = {"scenario": name, "dash_rps": dash["rps"], "dash_p50_ms": dash["p50_ms"],
+               "dash_p99_ms": dash["p99_ms"], "dash_errors": dash["errors"]}
+        if flood:
+            attack_stats = results["flood"].summary()
+            row.update(login_rps=attack_stats["rps"], login_p99_ms=attack_stats["p99_ms"])
+        rows.append(row)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows, ["scenario", "dash_rps", "dash_p50_ms", "dash_p99_ms", "dash_errors",
+                           "login_rps", "login_p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
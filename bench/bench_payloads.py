@@ -0,0 +1,92 @@
+"""
+Bytes on the wire and server CPU per /ambulances and /resolved_cases response,
+for each JSON serializer and content encoding. `cpu_ms` is the whole request
+(including the Mongo stand-in); `encode_ms` is JSON encoding alone.
+
+    python -m bench.bench_payloads --ambulances 200 --resolved 5000
+"""
+import argparse
+import json
+import time
+
+import config
+from bench.common import BENCH_EMAIL, BENCH_HOSPITAL, make_stand_in_client, print_table
+from bench.datagen import EPOCH, SwiftAidDataGenerator
+from compression import available_encodings
+from serialization import orjson
+
+PATHS = {"/ambulances": ("ambulances", "ambulances"), "/resolved_cases": ("resolved_cases", "resolved_cases")}
+
+
+def seed(db, ambulances, resolved, seed_value):
+    gen = SwiftAidDataGenerator(incidents=0, hospitals=1, ambulances_per_hospital=ambulances, seed=seed_value)
+    gen.populate(db)
+    db["resolved_cases"].insert_many([{
+        "incident_id": f"{i:024x}", "user_email": f"user{i}@swiftaid.test", "hospital_name": BENCH_HOSPITAL,
+        "ambulance_id": None, "driver_name": "Ravi Kumar", "vehicle_number": "KA-17-0001",
+        "resolved_at": EPOCH,
+    } for i in range(resolved)])
+
+
+def measure(app, path, encoding, iterations):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["email"] = BENCH_EMAIL
+        sess["hospital_name"] = BENCH_HOSPITAL
+    headers = {"Accept-Encoding": encoding} if encoding != "identity" else {"Accept-Encoding": "identity"}
+    resp = client.get(path, headers=headers)  # warm-up
+    cpu_start = time.process_time()
+    for _ in range(iterations):
+        resp = client.get(path, headers=headers)
+    cpu = (time.process_time() - cpu_start) / iterations
+    return {
+        "bytes": len(resp.data),
+        "encoding": resp.headers.get("Content-Encoding", "identity"),
+        "cpu_ms": round(cpu * 1000, 3),
+    }
+
+
+def measure_encode(app, db, path, iterations):
+    collection, key = PATHS[path]
+    docs = list(db[collection].find({"hospital_name": BENCH_HOSPITAL}))
+    with app.app_context():
+        start = time.process_time()
+        for _ in range(iterations):
+            app.json.response({"success": True, key: docs})
+        return round((time.process_time() - start) / iterations * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", help="local mongod (default: mongomock)")
+    parser.add_argument("--ambulances", type=int, default=200)
+    parser.add_argument("--resolved", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    from app import create_app
+
+    client = make_stand_in_client(args.mongo_uri)
+    seed(client["SwiftAid"], args.ambulances, args.resolved, args.seed)
+
+    serializers = ["stdlib"] + (["orjson"] if orjson is not None else [])
+    rows = []
+    for serializer in serializers:
+        config.JSON_SERIALIZER = serializer
+        app = create_app(mongo_client=client)
+        for path in PATHS:
+            encode_ms = measure_encode(app, client["SwiftAid"], path, args.iterations)
+            for encoding in ("identity",) + available_encodings():
+                rows.append({"path": path, "serializer": serializer, "encode_ms": encode_ms,
+                             **measure(app, path, encoding, args.iterations)})
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows, ["path", "serializer", "encoding", "bytes", "cpu_ms", "encode_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Sustained ambulance GPS pings/sec through POST /api/ambulances/positions.
+
+    python -m bench.bench_positions --mongo-uri mongodb://localhost:27017 --fleet 500 --batch-sizes 1 20
+
+Devices report every ambulance in `--fleet` round-robin. Besides the ingest
+rate, the table shows how many MongoDB writes the write-behind flush issued
+for those pings. The flush is a real bulk_write, so this needs a mongod
+(mongomock's bulk_write rejects current pymongo UpdateOne operations).
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime
+
+import config
+from bench.common import make_stand_in_client, print_table, run_sessions, serve_in_thread
+
+BENCH_KEY = "bench-positions-key"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", required=True, help="local mongod")
+    parser.add_argument("--fleet", type=int, default=500, help="ambulances reporting")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 20])
+    parser.add_argument("--clients", type=int, default=8, help="concurrent devices / gateways")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per batch size")
+    parser.add_argument("--flush-interval", type=float, default=config.POSITION_FLUSH_S)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    from app import create_app
+
+    config.INGEST_API_KEYS = [BENCH_KEY]
+    config.POSITION_FLUSH_S = args.flush_interval
+    client = make_stand_in_client(args.mongo_uri)
+    ambulances = client["SwiftAid"]["ambulances"]
+    ambulances.delete_many({"hospital_name": "Bench Fleet"})
+    ids = [str(_id) for _id in ambulances.insert_many([
+        {"vehicle_number": f"KA-17-{i:04d}", "driver_name": "Bench Driver", "hospital_name": "Bench Fleet",
+         "status": "available", "current_incident_id": None}
+        for i in range(args.fleet)
+    ]).inserted_ids]
+
+    app = create_app(mongo_client=client)
+    buffer = app.extensions["positions"]
+    base_url, server = serve_in_thread(app)
+    rng = random.Random(args.seed)
+
+    rows = []
+    for size in args.batch_sizes:
+        before = dict(buffer.stats)
+
+        def ping(sess, i):
+            now = datetime.utcnow().isoformat() + "Z"
+            body = json.dumps({"positions": [{
+                "ambulance_id": ids[(i * size + j) % len(ids)],
+                "lat": round(14.4663 + rng.uniform(-0.05, 0.05), 6),
+                "lng": round(75.9219 + rng.uniform(-0.05, 0.05), 6),
+                "speed": round(rng.uniform(0, 80), 1),
+                "recorded_at": now,
+            } for j in range(size)]})
+            status, data, _ = sess.request("POST", "/api/ambulances/positions", body=body,
+                                           headers={"Content-Type": "application/json", "X-API-Key": BENCH_KEY})
+            return status, data
+
+        stats = run_sessions(base_url, args.clients, args.duration, ping, login=False)
+        time.sleep(args.flush_interval * 1.5)  # let the last flush land
+        summary = stats.summary()
+        pings = buffer.stats["pings"] - before["pings"]
+        written = buffer.stats["written"] - before["written"]
+        rows.append({
+            "batch": size,
+            "requests_s": summary["rps"],
+            "pings_s": round(summary["rps"] * size),
+            "p50_ms": summary["p50_ms"],
+            "p99_ms": summary["p99_ms"],
+            "pings": pings,
+            "db_writes": written,
+            "flushes": buffer.stats["flushes"] - before["flushes"],
+            "errors": summary["errors"] + buffer.stats["errors"] - before["errors"],
+        })
+
+    server.shutdown()
+    buffer.close()
+    ambulances.delete_many({"hospital_name": "Bench Fleet"})
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows, ["batch", "requests_s", "pings_s", "p50_ms", "p99_ms", "pings", "db_writes", "flushes",
+                           "errors"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Top-K priority queue versus scoring and sorting every open incident.
+
+    python -m bench.bench_priority --scales 1000 10000 100000 --k 10 100
+    python -m bench.bench_priority --mongo-uri mongodb://localhost:27017
+
+"full" fetches every incident and ranks it with the same NumPy scoring;
+"top_k" walks the priority index and stops once the k-th score is settled.
+mongomock sorts in Python without indexes; compare against a real mongod.
+"""
+import argparse
+import json
+import time
+from datetime import timezone
+
+import numpy as np
+
+from bench.common import make_stand_in_client, percentile, print_table
+from bench.datagen import CITIES, SwiftAidDataGenerator
+from db import ensure_indexes
+from priority import priority_keys, score, top_k
+
+
+def full_sort(collection, k, origin, now_minutes):
+    docs = list(collection.find({"group_primary": {"$ne": False}}))
+    scores = score(docs, priority_keys(docs), origin, now_minutes)
+    return [docs[i] for i in np.argsort(-scores, kind="stable")[:k]]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(percentile(sorted(samples), 50), 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", help="local mongod (default: mongomock)")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 10_000])
+    parser.add_argument("--k", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    client = make_stand_in_client(args.mongo_uri)
+    db = client["SwiftAidBench"]
+    origin = CITIES[0][1:]
+    rows = []
+    for scale in args.scales:
+        SwiftAidDataGenerator(incidents=scale, hospitals=1, seed=args.seed).populate(db)
+        ensure_indexes(db)
+        now = max(doc["metadata"]["created_at"] for doc in db["incidents"].find({}, {"metadata.created_at": 1}))
+        now_minutes = now.replace(tzinfo=timezone.utc).timestamp() / 60
+        for k in args.k:
+            same = ([d["_id"] for d in top_k(db["incidents"], k, origin=origin, now=now)]
+                    == [d["_id"] for d in full_sort(db["incidents"], k, origin, now_minutes)])
+            rows.append({
+                "incidents": scale,
+                "k": k,
+                "full_ms": timed(lambda: full_sort(db["incidents"], k, origin, now_minutes), args.repeat),
+                "top_k_ms": timed(lambda: top_k(db["incidents"], k, origin=origin, now=now), args.repeat),
+                "same_order": same,
+            })
+
+    client.drop_database("SwiftAidBench")
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows, ["incidents", "k", "full_ms", "top_k_ms", "same_order"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Route-level benchmark: latency and Mongo ops per request vs data size.
+
+Each route is driven through the Flask test client against mongomock (default)
+or a local mongod, with data from bench.datagen at every requested scale:
+
+    python -m bench.bench_routes --scales 1000 10000 100000
+    python -m bench.bench_routes --mongo-uri mongodb://localhost:27017 --scales 1000 100000 1000000
+"""
+import argparse
+import functools
+import json
+import threading
+import time
+
+from bench.common import BENCH_EMAIL, BENCH_HOSPITAL, make_stand_in_client, percentile, print_table
+from bench.datagen import SwiftAidDataGenerator
+from metrics import current_trace
+
+MONGOMOCK_OPS = (
+    "find", "find_one", "count_documents", "estimated_document_count", "aggregate", "distinct",
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one", "delete_one",
+    "delete_many", "bulk_write", "find_one_and_update",
+)
+
+
+def count_mongomock_ops():
+    """mongomock emits no command events: attribute its collection calls to the current request instead."""
+    import mongomock
+
+    nesting = threading.local()
+
+    def wrap(name, method):
+        @functools.wraps(method)
+        def counted(self, *args, **kwargs):
+            # mongomock implements some operations on top of others: count only the outer call
+            depth = getattr(nesting, "depth", 0)
+            nesting.depth = depth + 1
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                nesting.depth = depth
+                trace = current_trace()
+                if trace is not None and depth == 0:
+                    trace.commands.append((name, time.perf_counter() - start, True))
+        return counted
+
+    for name in MONGOMOCK_OPS:
+        method = getattr(mongomock.Collection, name, None)
+        if method is not None and not hasattr(method, "__wrapped__"):
+            setattr(mongomock.Collection, name, wrap(name, method))
+
+
+def routes(incident_ids):
+    sample_incident = incident_ids[len(incident_ids) // 2]
+    return [
+        ("dashboard", "GET", "/"),
+        ("get_ambulances", "GET", "/ambulances"),
+        ("get_resolved_cases", "GET", "/resolved_cases"),
+        ("case_detail", "GET", f"/case/{sample_incident}"),
+        ("search_hospitals_api", "GET", "/api/hospitals/search?q=hosp&limit=8"),
+    ]
+
+
+def bench_scale(app, incident_ids, iterations):
+    ops_per_request = []
+
+    @app.after_request
+    def capture_ops(response):
+        trace = current_trace()
+        ops_per_request.append(len(trace.commands) if trace else 0)
+        return response
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["email"] = BENCH_EMAIL
+        sess["hospital_name"] = BENCH_HOSPITAL
+
+    rows = []
+    for name, method, path in routes(incident_ids):
+        client.open(path, method=method)  # warm-up
+        ops_per_request.clear()
+        latencies = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            resp = client.open(path, method=method)
+            latencies.append(time.perf_counter() - start)
+            if resp.status_code >= 500:
+                raise RuntimeError(f"{path} returned {resp.status_code}")
+        latencies.sort()
+        rows.append({
+            "route": name,
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "mongo_ops": round(sum(ops_per_request) / max(len(ops_per_request), 1), 1),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", help="local mongod (default: mongomock)")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 10000], help="incident counts")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    from app import create_app
+
+    if not args.mongo_uri:
+        count_mongomock_ops()
+
+    rows = []
+    baseline = {}
+    for scale in args.scales:
+        client = make_stand_in_client(args.mongo_uri)
+        incident_ids = SwiftAidDataGenerator(incidents=scale, seed=args.seed).populate(client["SwiftAid"])
+        for row in bench_scale(create_app(mongo_client=client), incident_ids, args.iterations):
+            base = baseline.setdefault(row["route"], row["mean_ms"])
+            rows.append({"incidents": scale, **row, "x_vs_smallest": round(row["mean_ms"] / base, 2) if base else ""})
+        client.close()
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows, ["incidents", "route", "mean_ms", "p50_ms", "p99_ms", "mongo_ops", "x_vs_smallest"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Shared helpers for the SwiftAid benchmark / load-test scripts.
+
+Run the scripts from the repo root, e.g. `python -m bench.loadtest`.
+"""
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+from werkzeug.security import generate_password_hash
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+BENCH_EMAIL = "bench@swiftaid.test"
+BENCH_PASSWORD = "bench-password"
+BENCH_HOSPITAL = "Bench General Hospital"
+
+
+def make_stand_in_client(mongo_uri=None):
+    """Local Mongo stand-in: mongomock by default, or a local mongod when a URI is given."""
+    if mongo_uri:
+        from pymongo import MongoClient
+        return MongoClient(mongo_uri)
+    import mongomock
+    return mongomock.MongoClient()
+
+
+def seed_hospital(db, email=BENCH_EMAIL, password=BENCH_PASSWORD, hospital_name=BENCH_HOSPITAL):
+    """Insert (or replace) the hospital account the load clients log in with."""
+    db["hospital_user"].replace_one(
+        {"email": email},
+        {
+            "hospital_name": hospital_name,
+            "email": email,
+            "phone": "9999999999",
+            "location": "Davanagere, Karnataka",
+            "password": generate_password_hash(password),
+        },
+        upsert=True,
+    )
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def serve_in_thread(app, host="127.0.0.1", port=0):
+    """Start a threaded werkzeug server for `app`; returns (base_url, server)."""
+    server = make_server(host, port, app, threaded=True, request_handler=_QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://{host}:{server.server_port}", server
+
+
+class Session:
+    """A keep-alive HTTP connection that carries the Flask session cookie."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+        self.cookie = None
+
+    def request(self, method, path, body=None, headers=None, form=None):
+        headers = dict(headers or {})
+        if form is not None:
+            body = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        elif body is not None and not isinstance(body, (bytes, str)):
+            body = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            # Server closed the keep-alive connection: reconnect once
+            self.conn.close()
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+        data = resp.read()
+        set_cookie = resp.getheader("Set-Cookie")
+        if set_cookie:
+            self.cookie = set_cookie.split(";", 1)[0]
+        return resp.status, data, resp
+
+    def login(self, email=BENCH_EMAIL, password=BENCH_PASSWORD):
+        status, _, _ = self.request("POST", "/login", form={"email": email, "password": password})
+        if status != 302:
+            raise RuntimeError(f"login failed for {email} (HTTP {status})")
+
+    def close(self):
+        self.conn.close()
+
+
+class Stats:
+    """Thread-safe latency / error recorder."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.errors = 0
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, seconds, ok=True):
+        with self.lock:
+            self.latencies.append(seconds)
+            if not ok:
+                self.errors += 1
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def summary(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        lat = sorted(self.latencies)
+        count = len(lat)
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "error_rate": self.errors / count if count else 0.0,
+            "elapsed_s": round(elapsed, 3),
+            "rps": round(count / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(percentile(lat, 50) * 1000, 2),
+            "p99_ms": round(percentile(lat, 99) * 1000, 2),
+        }
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def login_cookie(base_url):
+    """Log the bench account in once and return its session cookie."""
+    sess = Session(base_url)
+    try:
+        sess.login()
+    finally:
+        sess.close()
+    if sess.cookie is None:
+        raise RuntimeError("the load session failed to log in")
+    return sess.cookie
+
+
+def open_sessions(base_url, count, login=True, cookie=None):
+    """
+    Open `count` sessions sharing one session `cookie`. With login and no cookie, the bench
+    account logs in once (the login throttle allows only a few attempts per email).
+    """
+    if login and cookie is None:
+        cookie = login_cookie(base_url)
+    sessions = [Session(base_url) for _ in range(count)]
+    for sess in sessions:
+        sess.cookie = cookie
+    return sessions
+
+
+def run_sessions(base_url, sessions, duration, step, login=True, cookie=None):
+    """
+    Run `sessions` concurrent clients for `duration` seconds.
+    `step(session, i)` issues one request and returns (status, body); 5xx and
+    connection failures count as errors.
+    """
+    clients = open_sessions(base_url, sessions, login, cookie)
+    stats = Stats()
+    deadline = stats.started + duration
+
+    def worker(sess):
+        i = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                status, _ = step(sess, i)
+                ok = status < 500
+            except Exception:
+                ok = False
+            stats.record(time.perf_counter() - start, ok)
+            i += 1
+        sess.close()
+
+    threads = [threading.Thread(target=worker, args=(s,)) for s in clients]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats.stop()
+    return stats
+
+
+def start_server(cmd, base_url, env=None, timeout=30):
+    """Launch a server subprocess and wait until its /healthz answers."""
+    import os
+    import subprocess
+    proc = subprocess.Popen(cmd, env={**os.environ, **(env or {})},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{cmd[0]} exited with code {proc.returncode}")
+        try:
+            sess = Session(base_url)
+            status, _, _ = sess.request("GET", "/healthz")
+            sess.close()
+            if status == 200:
+                return proc
+        except OSError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"{cmd[0]} did not become healthy within {timeout}s")
+
+
+def print_table(rows, columns):
+    widths = [max(len(str(c)), *(len(str(r.get(c, ""))) for r in rows)) for c in columns]
+    print("  ".join(str(c).ljust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row.get(c, "")).ljust(w) for c, w in zip(columns, widths)))
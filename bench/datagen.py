@@ -0,0 +1,142 @@
+"""
+Seeded synthetic SwiftAid data.
+
+    python -m bench.datagen --mongo-uri mongodb://localhost:27017 --incidents 100000
+
+Produces incidents (lat/lng around Karnataka, speed, accel_mag,
+metadata.created_at, severity), case_status, ambulances, resolved_cases and
+hospital_user documents. The same seed always yields the same data.
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from bench.common import BENCH_EMAIL, BENCH_HOSPITAL, BENCH_PASSWORD, make_stand_in_client
+from priority import assign_priority
+
+CITIES = [
+    ("Davanagere", 14.4663, 75.9219),
+    ("Bangalore", 12.9716, 77.5946),
+    ("Mysore", 12.2958, 76.6394),
+    ("Hubli", 15.3647, 75.1240),
+    ("Mangalore", 12.9141, 74.8560),
+    ("Belgaum", 15.8497, 74.4977),
+]
+BATCH = 10_000
+EPOCH = datetime(2025, 1, 1)
+
+
+class SwiftAidDataGenerator:
+    def __init__(self, incidents=1000, hospitals=10, ambulances_per_hospital=10,
+                 accepted_ratio=0.3, resolved_ratio=0.2, seed=42):
+        self.incidents = incidents
+        self.hospitals = hospitals
+        self.ambulances_per_hospital = ambulances_per_hospital
+        self.accepted_ratio = accepted_ratio
+        self.resolved_ratio = resolved_ratio
+        self.rng = random.Random(seed)
+        self.hospital_names = [BENCH_HOSPITAL] + [f"{CITIES[i % len(CITIES)][0]} Hospital {i}"
+                                                  for i in range(1, hospitals)]
+
+    def hospital_users(self):
+        # Hashing is deliberately slow; every synthetic account shares one hash
+        password = generate_password_hash(BENCH_PASSWORD)
+        for i, name in enumerate(self.hospital_names):
+            city, lat, lng = CITIES[i % len(CITIES)]
+            yield {
+                "hospital_name": name,
+                "email": BENCH_EMAIL if i == 0 else f"hospital{i}@swiftaid.test",
+                "phone": f"9{i:09d}",
+                "location": f"{city}, Karnataka",
+                "lat": lat,
+                "lng": lng,
+                "password": password,
+            }
+
+    def incident(self, i):
+        rng = self.rng
+        _, lat, lng = rng.choice(CITIES)
+        return {
+            "user_email": f"user{rng.randrange(self.incidents * 2 or 1)}@swiftaid.test",
+            "lat": round(lat + rng.gauss(0, 0.08), 6),
+            "lng": round(lng + rng.gauss(0, 0.08), 6),
+            "speed": round(max(0.0, rng.gauss(55, 25)), 1),
+            "accel_mag": round(abs(rng.gauss(3.5, 2.0)), 3),
+            "metadata": {"created_at": EPOCH + timedelta(seconds=rng.randrange(180 * 86400) + i)},
+        }
+
+    def ambulance(self, hospital_name, j):
+        rng = self.rng
+        return {
+            "vehicle_number": f"KA-{rng.randrange(1, 70):02d}-{j:04d}",
+            "driver_name": rng.choice(["Ravi Kumar", "Suresh", "Anil Gowda", "Manjunath", "Prakash"]),
+            "phone": f"{rng.randrange(10**9, 10**10)}",
+            "status": "available",
+            "hospital_name": hospital_name,
+            "current_incident_id": None,
+        }
+
+    def populate(self, db, drop=True):
+        """Write everything to `db`; returns the inserted incident ids (as strings)."""
+        names = ["hospital_user", "incidents", "case_status", "ambulances", "resolved_cases"]
+        if drop:
+            for name in names:
+                db[name].drop()
+
+        db["hospital_user"].insert_many(list(self.hospital_users()))
+
+        incident_ids = []
+        for start in range(0, self.incidents, BATCH):
+            docs = [self.incident(i) for i in range(start, min(start + BATCH, self.incidents))]
+            assign_priority(docs)
+            incident_ids.extend(str(_id) for _id in db["incidents"].insert_many(docs).inserted_ids)
+
+        ambulances = [self.ambulance(name, j) for name in self.hospital_names
+                      for j in range(self.ambulances_per_hospital)]
+        db["ambulances"].insert_many(ambulances)
+
+        statuses = []
+        for incident_id in self.rng.sample(incident_ids, int(len(incident_ids) * self.accepted_ratio)):
+            statuses.append({
+                "incident_id": incident_id,
+                "hospital_name": self.rng.choice(self.hospital_names),
+                "status": "accepted",
+                "updated_at": EPOCH,
+            })
+        for start in range(0, len(statuses), BATCH):
+            db["case_status"].insert_many(statuses[start:start + BATCH])
+
+        resolved = [{
+            "incident_id": f"{self.rng.getrandbits(96):024x}",
+            "user_email": f"user{i}@swiftaid.test",
+            "hospital_name": self.rng.choice(self.hospital_names),
+            "ambulance_id": None,
+            "driver_name": "Ravi Kumar",
+            "vehicle_number": "KA-17-0001",
+            "resolved_at": (EPOCH + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S"),
+        } for i in range(int(self.incidents * self.resolved_ratio))]
+        for start in range(0, len(resolved), BATCH):
+            db["resolved_cases"].insert_many(resolved[start:start + BATCH])
+
+        return incident_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", required=True)
+    parser.add_argument("--db", default="SwiftAid")
+    parser.add_argument("--incidents", type=int, default=1000)
+    parser.add_argument("--hospitals", type=int, default=10)
+    parser.add_argument("--ambulances-per-hospital", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    gen = SwiftAidDataGenerator(args.incidents, args.hospitals, args.ambulances_per_hospital, seed=args.seed)
+    ids = gen.populate(make_stand_in_client(args.mongo_uri)[args.db])
+    print(f"seeded {len(ids)} incidents, {args.hospitals} hospitals into {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Load-test harness: requests/sec of the dashboard and polling endpoints.
+
+In-process (werkzeug threaded server + mongomock stand-in):
+    python -m bench.loadtest --sessions 20 --duration 10
+
+Against a running production server (e.g. gunicorn backed by a local mongod):
+    MONGO_URI=mongodb://localhost:27017 gunicorn -c gunicorn.conf.py wsgi:app
+    python -m bench.loadtest --url http://127.0.0.1:8000 --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import json
+
+from bench.common import login_cookie, make_stand_in_client, print_table, run_sessions, seed_hospital, serve_in_thread
+
+DEFAULT_PATHS = ["/", "/ambulances", "/resolved_cases"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="target an already running server instead of an in-process one")
+    parser.add_argument("--mongo-uri", help="local mongod used for seeding (default: mongomock, in-process only)")
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent logged-in clients")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per path")
+    parser.add_argument("--path", action="append", dest="paths", help="path to hit (repeatable)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    client = make_stand_in_client(args.mongo_uri)
+    seed_hospital(client["SwiftAid"])
+
+    server = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        from app import create_app
+        base_url, server = serve_in_thread(create_app(mongo_client=client))
+
+    # One login shared by every session and path, so the per-email login throttle is never hit
+    cookie = login_cookie(base_url)
+    rows = []
+    for path in args.paths or DEFAULT_PATHS:
+        stats = run_sessions(base_url, args.sessions, args.duration, lambda s, i: s.request("GET", path)[:2],
+                             cookie=cookie)
+        rows.append({"path": path, **stats.summary()})
+
+    if server is not None:
+        server.shutdown()
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows, ["path", "requests", "rps", "p50_ms", "p99_ms", "errors"])
+
+
+if __name__ == "__main__":
+    main()
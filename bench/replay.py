@@ -0,0 +1,219 @@
+"""
+Replay a traffic capture (RECORD_TRAFFIC_PATH, see traffic.py) as a load test.
+
+Every simulated hospital session replays the recorded request timeline,
+compressed by --speed and started at a random phase, so the route mix and
+burst shape (e.g. shift change) match the capture. Request bodies are
+rebuilt from the recorded shapes with ids drawn from the seeded data.
+
+    RECORD_TRAFFIC_PATH=capture.jsonl gunicorn -c gunicorn.conf.py wsgi:app   # record
+    python -m bench.replay capture.jsonl --speed 10 --sessions 50              # replay in-process
+    python -m bench.replay capture.jsonl --mongo-uri mongodb://localhost:27017 --url http://127.0.0.1:8000
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+
+from bench.common import BENCH_PASSWORD, Session, Stats, make_stand_in_client, print_table, serve_in_thread
+from bench.datagen import SwiftAidDataGenerator
+
+# Session lifecycle is driven by the replayer itself
+SKIPPED_ENDPOINTS = {"main.login", "main.logout", "main.register"}
+PLACEHOLDER = re.compile(r"<(?:\w+:)?(\w+)>")
+
+
+def load_capture(path):
+    events = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            event = json.loads(line)
+            if event.get("endpoint") in SKIPPED_ENDPOINTS or not event.get("rule"):
+                continue
+            events.append(event)
+    if not events:
+        raise SystemExit(f"{path}: no replayable requests")
+    events.sort(key=lambda e: e["t"])
+    origin = events[0]["t"]
+    for event in events:
+        event["t"] -= origin
+    return events
+
+
+class Values:
+    """Realistic ids and field values for rebuilding recorded requests."""
+
+    def __init__(self, db, incident_ids, rng):
+        self.rng = rng
+        self.incident_ids = incident_ids
+        self.ambulance_ids = [str(a["_id"]) for a in db["ambulances"].find({}, {"_id": 1})]
+        self.resolved_ids = [str(c["_id"]) for c in db["resolved_cases"].find({}, {"_id": 1})] or ["0" * 24]
+
+    def for_field(self, name, kind):
+        if name in ("incident_id",):
+            return self.rng.choice(self.incident_ids)
+        if name in ("ambulance_id",):
+            return self.rng.choice(self.ambulance_ids)
+        if name in ("case_id",):
+            return self.rng.choice(self.resolved_ids)
+        if name == "phone":
+            return f"{self.rng.randrange(10**9, 10**10)}"
+        if name == "driver_name":
+            return "Replay Driver"
+        if kind in ("int", "float"):
+            return self.rng.randrange(100)
+        if kind == "bool":
+            return True
+        if kind == "NoneType":
+            return None
+        # Anything else recorded with its literal value (enum fields such as "status")
+        return kind if kind not in ("str", "dict", "list") else f"replay-{self.rng.randrange(10**6)}"
+
+    def request_for(self, event):
+        path = event["path"]
+        rule = event["rule"]
+        if "<" in rule:
+            query = path.partition("?")[2]
+            path = PLACEHOLDER.sub(lambda m: self.for_field(m.group(1), "str"), rule)
+            if query:
+                path += "?" + query
+        body = event.get("body")
+        if not body or event["method"] == "GET":
+            return event["method"], path, None
+        return event["method"], path, {k: self.for_field(k, v) for k, v in body.items()}
+
+
+def timeline(events, start_index):
+    """Recorded offsets, rotated to begin at `start_index` (one capture period, monotonic)."""
+    gaps = [b["t"] - a["t"] for a, b in zip(events, events[1:])]
+    period = events[-1]["t"] + (sum(gaps) / len(gaps) if gaps else 1.0)
+    base = events[start_index]["t"]
+    ordered = [(e["t"] - base, e) for e in events[start_index:]]
+    ordered += [(e["t"] + period - base, e) for e in events[:start_index]]
+    return ordered, period
+
+
+def replay(base_url, events, values, sessions, speed, accounts, loops):
+    overall = Stats()
+    per_endpoint = {e["endpoint"]: Stats() for e in events}
+    client_errors = Counter()
+    lock = threading.Lock()
+
+    # One login per account, its cookie shared by that account's sessions (logins are throttled)
+    cookies = {}
+    clients = []
+    for i in range(sessions):
+        account = accounts[i % len(accounts)]
+        sess = Session(base_url)
+        if account not in cookies:
+            sess.login(account, BENCH_PASSWORD)
+            cookies[account] = sess.cookie
+        sess.cookie = cookies[account]
+        clients.append(sess)
+
+    def run(sess, start_index):
+        ordered, period = timeline(events, start_index)
+        started = time.perf_counter()
+        for loop in range(loops):
+            for offset, event in ordered:
+                delay = started + (loop * period + offset) / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                method, path, body = values.request_for(event)
+                t0 = time.perf_counter()
+                try:
+                    status, _, _ = sess.request(method, path, body=body)
+                    ok = status < 500
+                except Exception:
+                    status, ok = 0, False
+                elapsed = time.perf_counter() - t0
+                overall.record(elapsed, ok)
+                per_endpoint[event["endpoint"]].record(elapsed, ok)
+                if 400 <= status < 500:
+                    with lock:
+                        client_errors[event["endpoint"]] += 1
+        sess.close()
+
+    # Random phase per session so they do not fire in lockstep
+    starts = [values.rng.randrange(len(events)) for _ in clients]
+    overall.started = time.perf_counter()
+    threads = [threading.Thread(target=run, args=(s, k)) for s, k in zip(clients, starts)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    overall.stop()
+    return overall, per_endpoint, client_errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("capture", help="JSONL written by RECORD_TRAFFIC_PATH")
+    parser.add_argument("--url", help="target an already running server (seeded through --mongo-uri)")
+    parser.add_argument("--mongo-uri", help="local mongod (default: in-process mongomock)")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression factor")
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent simulated hospital sessions")
+    parser.add_argument("--hospitals", type=int, default=10, help="distinct hospital accounts to spread sessions over")
+    parser.add_argument("--incidents", type=int, default=2000)
+    parser.add_argument("--loops", type=int, default=1, help="times each session replays the capture")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    events = load_capture(args.capture)
+    mix = Counter(e["endpoint"] for e in events)
+
+    client = make_stand_in_client(args.mongo_uri)
+    db = client["SwiftAid"]
+    gen = SwiftAidDataGenerator(incidents=args.incidents, hospitals=args.hospitals, seed=args.seed)
+    incident_ids = gen.populate(db)
+    accounts = [u["email"] for u in db["hospital_user"].find({}, {"email": 1})]
+    values = Values(db, incident_ids, random.Random(args.seed))
+
+    server = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        from app import create_app
+        base_url, server = serve_in_thread(create_app(mongo_client=client))
+
+    overall, per_endpoint, client_errors = replay(
+        base_url, events, values, args.sessions, args.speed, accounts, args.loops)
+
+    if server is not None:
+        server.shutdown()
+
+    rows = []
+    for endpoint, stats in sorted(per_endpoint.items()):
+        summary = stats.summary()
+        rows.append({
+            "endpoint": endpoint,
+            "mix_pct": round(100 * mix[endpoint] / len(events), 1),
+            "requests": summary["requests"],
+            "p50_ms": summary["p50_ms"],
+            "p99_ms": summary["p99_ms"],
+            "5xx_rate": round(summary["error_rate"], 4),
+            "4xx_rate": round(client_errors[endpoint] / summary["requests"], 4) if summary["requests"] else 0,
+        })
+    total = overall.summary()
+    rows.append({"endpoint": "TOTAL", "mix_pct": 100.0, "requests": total["requests"], "p50_ms": total["p50_ms"],
+                 "p99_ms": total["p99_ms"], "5xx_rate": round(total["error_rate"], 4),
+                 "4xx_rate": round(sum(client_errors.values()) / total["requests"], 4) if total["requests"] else 0})
+
+    if args.json:
+        print(json.dumps({"throughput_rps": total["rps"], "elapsed_s": total["elapsed_s"], "endpoints": rows},
+                         indent=2))
+    else:
+        print(f"throughput: {total['rps']} req/s over {total['elapsed_s']}s "
+              f"({args.sessions} sessions, {args.speed}x speed)")
+        print_table(rows, ["endpoint", "mix_pct", "requests", "p50_ms", "p99_ms", "5xx_rate", "4xx_rate"])
+
+
+if __name__ == "__main__":
+    main()
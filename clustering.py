@@ -0,0 +1,170 @@
+"""
+Spatio-temporal grouping of duplicate crash reports.
+
+One crash often arrives as several reports (occupants' phones, retries).
+Each report is filed under a grid cell of roughly CLUSTER_RADIUS_M x
+CLUSTER_WINDOW_S; a new report only has to look at the neighbouring cells
+(3 x 3 x 3 keys: reports can arrive out of time order, so the time buckets
+on both sides are searched) to find a group within the distance and time
+window, so assignment is O(1) per report. A batch needs one indexed $in
+query for all of its neighbour cells; matching then runs on an in-memory grid.
+
+Every report carries `group_id` (the id of the group's first report, which
+is what case_status refers to). The first report is the group's primary
+(`group_primary: True`, `report_count`); the others are `group_primary: False`.
+Rows without these fields are treated as single-report groups.
+"""
+import math
+from collections import defaultdict
+from datetime import timezone
+
+from bson import ObjectId
+
+import config
+
+EARTH_RADIUS_M = 6_371_000
+METERS_PER_DEGREE = 111_320
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(1.0, a)))
+
+
+class Grid:
+    """Cell keys "<lat row>:<lng col>:<time bucket>" sized to the merge radius and window."""
+
+    def __init__(self, radius_m=None, window_s=None):
+        self.radius_m = radius_m or config.CLUSTER_RADIUS_M
+        self.window_s = window_s or config.CLUSTER_WINDOW_S
+        self.dlat = self.radius_m / METERS_PER_DEGREE
+
+    def _dlng(self, row):
+        center = (row + 0.5) * self.dlat
+        return self.dlat / max(math.cos(math.radians(center)), 0.01)
+
+    def _bucket(self, created_at):
+        if created_at.tzinfo is None:  # stored datetimes are naive UTC
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return math.floor(created_at.timestamp() / self.window_s)
+
+    def cell(self, lat, lng, created_at):
+        row = math.floor(lat / self.dlat)
+        return f"{row}:{math.floor(lng / self._dlng(row))}:{self._bucket(created_at)}"
+
+    def neighbours(self, lat, lng, created_at):
+        """Every cell that can hold a report within radius_m and window_s of this one, earlier or later."""
+        row = math.floor(lat / self.dlat)
+        bucket = self._bucket(created_at)
+        span = self.dlat / max(math.cos(math.radians(lat)), 0.01)
+        keys = []
+        for r in (row - 1, row, row + 1):
+            dlng = self._dlng(r)
+            for c in range(math.floor((lng - span) / dlng), math.floor((lng + span) / dlng) + 1):
+                keys.extend(f"{r}:{c}:{b}" for b in (bucket - 1, bucket, bucket + 1))
+        return keys
+
+    def matches(self, a, b):
+        dt = abs((a["metadata"]["created_at"] - b["metadata"]["created_at"]).total_seconds())
+        return dt <= self.window_s and haversine_m(a["lat"], a["lng"], b["lat"], b["lng"]) <= self.radius_m
+
+
+def assign_groups(collection, docs, grid=None):
+    """
+    Give each normalized report an _id, cluster_cell and group_id before insert.
+    Returns {existing primary id: reports joined}; settle_groups applies the counts after insert.
+    """
+    grid = grid or Grid()
+    # Earliest first, so a group's primary is its first report whatever order the batch came in
+    ordered = sorted(docs, key=lambda doc: doc["metadata"]["created_at"])
+    keyed = [(doc, grid.neighbours(doc["lat"], doc["lng"], doc["metadata"]["created_at"])) for doc in ordered]
+    wanted = sorted({key for _, keys in keyed for key in keys})
+
+    index = defaultdict(list)
+    if wanted:
+        projection = {"lat": 1, "lng": 1, "metadata.created_at": 1, "group_id": 1, "cluster_cell": 1}
+        for existing in collection.find({"cluster_cell": {"$in": wanted}}, projection):
+            existing.setdefault("group_id", str(existing["_id"]))
+            index[existing["cluster_cell"]].append(existing)
+
+    joined = defaultdict(int)
+    batch_primaries = {}
+    for doc, keys in keyed:
+        doc.setdefault("_id", ObjectId())
+        doc["cluster_cell"] = grid.cell(doc["lat"], doc["lng"], doc["metadata"]["created_at"])
+
+        best, best_distance = None, None
+        for key in keys:
+            for candidate in index.get(key, ()):
+                if grid.matches(doc, candidate):
+                    distance = haversine_m(doc["lat"], doc["lng"], candidate["lat"], candidate["lng"])
+                    if best is None or distance < best_distance:
+                        best, best_distance = candidate, distance
+
+        if best is None:
+            doc["group_id"] = str(doc["_id"])
+            doc["group_primary"] = True
+            doc["report_count"] = 1
+            batch_primaries[doc["group_id"]] = doc
+        else:
+            doc["group_id"] = best["group_id"]
+            doc["group_primary"] = False
+            if doc["group_id"] in batch_primaries:
+                batch_primaries[doc["group_id"]]["report_count"] += 1
+            else:
+                joined[doc["group_id"]] += 1
+        index[doc["cluster_cell"]].append(doc)
+    return dict(joined)
+
+
+def settle_groups(collection, docs, stored):
+    """
+    Apply a batch's grouping once insert_many is done. `stored` holds the _ids that were inserted:
+    only those count towards report_count, and stored reports whose primary from the same batch
+    was rejected are deleted again (they would point at a group that does not exist).
+    Returns the _ids of those deleted orphans.
+    """
+    batch_primaries = {doc["group_id"]: doc["_id"] in stored for doc in docs if doc["group_primary"]}
+    increments = defaultdict(int)
+    orphans = []
+    for doc in docs:
+        if doc["group_primary"]:
+            continue
+        primary_stored = batch_primaries.get(doc["group_id"])
+        if primary_stored is None:
+            if doc["_id"] in stored:
+                increments[doc["group_id"]] += 1
+        elif not primary_stored:
+            if doc["_id"] in stored:
+                orphans.append(doc["_id"])
+        elif doc["_id"] not in stored:
+            # assign_groups already counted it on the batch primary
+            increments[doc["group_id"]] -= 1
+
+    for group_id, count in increments.items():
+        if count:
+            collection.update_one({"_id": ObjectId(group_id)}, {"$inc": {"report_count": count}})
+    if orphans:
+        collection.delete_many({"_id": {"$in": orphans}})
+    return orphans
+
+
+def group_id_for(collection, incident_id):
+    """The group an incident id belongs to (legacy rows are their own group)."""
+    try:
+        doc = collection.find_one({"_id": ObjectId(incident_id)}, {"group_id": 1})
+    except Exception:
+        return incident_id
+    return (doc or {}).get("group_id") or incident_id
+
+
+def group_filter(group_id):
+    """Every report of a group, including a legacy row without group fields."""
+    return {"$or": [{"_id": ObjectId(group_id)}, {"group_id": group_id}]}
+
+
+# Dashboard feed: one row per group
+PRIMARY_FILTER = {"group_primary": {"$ne": False}}
@@ -0,0 +1,88 @@
+"""
+Negotiated response compression.
+
+Responses of at least COMPRESS_MIN_SIZE bytes with a text-like mimetype are
+encoded with brotli (when installed) or gzip, following the client's
+Accept-Encoding. A compressed response is a different representation, so its
+ETag gets an encoding suffix (see versions.etag_matches).
+"""
+import gzip
+
+from flask import request
+
+import config
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = frozenset({
+    "application/json", "text/html", "text/css", "text/plain", "application/javascript", "text/javascript",
+})
+ETAG_SUFFIXES = ("-br", "-gzip")
+
+
+def available_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encodings):
+    """Best encoding the client accepts (q > 0), preferring brotli."""
+    for encoding in available_encodings():
+        if accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=config.COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=config.COMPRESS_GZIP_LEVEL, mtime=0)
+
+
+class Compressor:
+    def __init__(self, min_size=None):
+        self.min_size = config.COMPRESS_MIN_SIZE if min_size is None else min_size
+
+    def init_app(self, app):
+        app.extensions["compressor"] = self
+        app.after_request(self.compress_response)
+
+    def compress_response(self, response):
+        if response.mimetype in COMPRESSIBLE_MIMETYPES:
+            response.vary.add("Accept-Encoding")
+        if response.status_code == 304:
+            return self._suffix_not_modified(response)
+        if (response.status_code != 200
+                or response.direct_passthrough
+                or response.is_streamed
+                or "Content-Encoding" in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        response.set_data(compress(data, encoding))
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak=weak)
+        return response
+
+    @staticmethod
+    def _suffix_not_modified(response):
+        """Echo the variant ETag the client revalidated, so its cached entry keeps matching."""
+        response.vary.add("Accept-Encoding")
+        etag, weak = response.get_etag()
+        if etag:
+            for suffix in ETAG_SUFFIXES:
+                if request.if_none_match.contains(etag + suffix):
+                    response.set_etag(etag + suffix, weak=weak)
+                    break
+        return response
@@ -7,4 +7,97 @@ MONGO_URI = os.getenv(
 )
 
 # Flask secret key
-SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
\ No newline at end of file
+SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
+
+# Flask debug mode (development server only)
+DEBUG = os.getenv("FLASK_DEBUG", "0") == "1"
+
+# Production server settings (read by gunicorn.conf.py)
+BIND = os.getenv("BIND", "0.0.0.0:8000")
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", (os.cpu_count() or 1) * 2 + 1))
+GUNICORN_THREADS = int(os.getenv("GUNICORN_THREADS", "4"))
+GUNICORN_TIMEOUT = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "20"))
+KEEPALIVE = int(os.getenv("KEEPALIVE", "5"))
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "0"))
+
+# MongoDB client / pool settings ("mongomock://" as MONGO_URI runs on an in-memory stand-in)
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "SwiftAid")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+MONGO_RETRY_WRITES = os.getenv("MONGO_RETRY_WRITES", "1") == "1"
+MONGO_RETRY_READS = os.getenv("MONGO_RETRY_READS", "1") == "1"
+
+# Log requests slower than this (milliseconds) with their Mongo query breakdown; 0 disables
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+
+# Logging (see logging_setup.py): root level plus per-logger overrides "name=LEVEL,..."
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+
+# Append a JSONL capture of every request here (for bench/replay.py); empty disables
+RECORD_TRAFFIC_PATH = os.getenv("RECORD_TRAFFIC_PATH", "")
+
+# JSON encoder for responses and |tojson: "orjson" (default when installed) or "stdlib"
+JSON_SERIALIZER = os.getenv("JSON_SERIALIZER", "auto")
+
+# Compress responses at least this many bytes when the client accepts br/gzip
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+
+# Incident ingestion API: comma-separated client keys (sent as X-API-Key); empty disables the endpoint
+INGEST_API_KEYS = [k.strip() for k in os.getenv("INGEST_API_KEYS", "").split(",") if k.strip()]
+INGEST_MAX_BATCH = int(os.getenv("INGEST_MAX_BATCH", "1000"))
+# A report's created_at may be at most this old (devices upload after losing signal) or this far
+# ahead of the server clock (skew; clamped to now); reports outside the window are rejected
+INGEST_MAX_REPORT_AGE_S = float(os.getenv("INGEST_MAX_REPORT_AGE_S", str(6 * 3600)))
+INGEST_MAX_CLOCK_SKEW_S = float(os.getenv("INGEST_MAX_CLOCK_SKEW_S", "300"))
+
+# Reports closer than this (metres and seconds) are merged into one incident group
+CLUSTER_RADIUS_M = float(os.getenv("CLUSTER_RADIUS_M", "150"))
+CLUSTER_WINDOW_S = float(os.getenv("CLUSTER_WINDOW_S", "120"))
+
+# Incident priority: points per km/h, per unit of accel_mag, per minute waiting and per km from the hospital
+PRIORITY_SPEED_WEIGHT = float(os.getenv("PRIORITY_SPEED_WEIGHT", "0.5"))
+PRIORITY_ACCEL_WEIGHT = float(os.getenv("PRIORITY_ACCEL_WEIGHT", "5"))
+PRIORITY_AGE_WEIGHT = float(os.getenv("PRIORITY_AGE_WEIGHT", "1"))
+# Waiting stops adding points after this many minutes (30 → at most +30, a 60 km/h difference)
+PRIORITY_AGE_CAP_MIN = float(os.getenv("PRIORITY_AGE_CAP_MIN", "30"))
+PRIORITY_DISTANCE_WEIGHT = float(os.getenv("PRIORITY_DISTANCE_WEIGHT", "2"))
+PRIORITY_DISTANCE_CAP_KM = float(os.getenv("PRIORITY_DISTANCE_CAP_KM", "50"))
+# Incidents shown on the dashboard feed, most urgent first
+PRIORITY_FEED_SIZE = int(os.getenv("PRIORITY_FEED_SIZE", "100"))
+
+# Map clusters: grid cells per map tile edge (4 → one cluster per 64x64 screen pixels)
+MAP_CELLS_PER_TILE = int(os.getenv("MAP_CELLS_PER_TILE", "4"))
+# A worker re-reads the open incidents for the map at most this often (seconds) while they keep changing
+MAP_SNAPSHOT_MIN_AGE_S = float(os.getenv("MAP_SNAPSHOT_MIN_AGE_S", "2"))
+
+# GPS pings are coalesced in memory and written to MongoDB this often (seconds)
+POSITION_FLUSH_S = float(os.getenv("POSITION_FLUSH_S", "2"))
+
+# Password hashing runs on a small per-worker pool; logins beyond the backlog get 503
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "16"))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+# Login attempts per worker: burst size and refill per minute, by client IP and by email
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "20"))
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", "10"))
+LOGIN_EMAIL_BURST = int(os.getenv("LOGIN_EMAIL_BURST", "5"))
+LOGIN_EMAIL_PER_MINUTE = float(os.getenv("LOGIN_EMAIL_PER_MINUTE", "5"))
+# Reverse proxies / load balancers in front of the app that append to X-Forwarded-For (and set
+# X-Forwarded-Proto/-Host). With 0, request.remote_addr (the per-IP login key) is the proxy's
+# address and every client shares one bucket; set it to the exact hop count, since a higher
+# value lets clients pick their own address with a forged header.
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+# OpenStreetMap hospital search used by registration (Nominatim asks for an identifying User-Agent)
+NOMINATIM_API_URL = os.getenv("NOMINATIM_API_URL", "https://nominatim.openstreetmap.org/search")
+NOMINATIM_USER_AGENT = os.getenv("NOMINATIM_USER_AGENT", "SwiftAid-Hospital-Dashboard/1.0")
@@ -0,0 +1,94 @@
+"""
+Lazy, fork-safe MongoDB access.
+
+The MongoClient is only built on first use and is rebuilt whenever the
+process id changes, so importing the app or calling create_app() never
+touches the network and a client is never shared across fork.
+"""
+import os
+import threading
+
+from pymongo import MongoClient
+
+import config
+
+MOCK_URI_PREFIX = "mongomock://"
+
+
+def client_options():
+    """Pool / timeout / retry settings passed to every MongoClient."""
+    return {
+        "maxPoolSize": config.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": config.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": config.MONGO_MAX_IDLE_TIME_MS,
+        "connectTimeoutMS": config.MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": config.MONGO_SOCKET_TIMEOUT_MS,
+        "waitQueueTimeoutMS": config.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "retryWrites": config.MONGO_RETRY_WRITES,
+        "retryReads": config.MONGO_RETRY_READS,
+    }
+
+
+class Mongo:
+    """Per-process MongoClient holder; pass `client` to inject a stand-in (mongomock, local mongod)."""
+
+    def __init__(self, uri=None, db_name=None, client=None, event_listeners=()):
+        self.uri = uri or config.MONGO_URI
+        self.db_name = db_name or config.MONGO_DB_NAME
+        self.event_listeners = list(event_listeners)
+        self._client = client
+        self._pid = os.getpid() if client is not None else None
+        self._injected = client is not None
+        self._lock = threading.Lock()
+
+    def _create_client(self):
+        if self.uri.startswith(MOCK_URI_PREFIX):
+            import mongomock
+            return mongomock.MongoClient()
+        return MongoClient(self.uri, connect=False, event_listeners=self.event_listeners, **client_options())
+
+    @property
+    def client(self):
+        if self._client is None or (not self._injected and self._pid != os.getpid()):
+            with self._lock:
+                if self._client is None or (not self._injected and self._pid != os.getpid()):
+                    # A client inherited over fork is unusable; drop it without closing the parent's sockets
+                    self._client = self._create_client()
+                    self._pid = os.getpid()
+        return self._client
+
+    @property
+    def db(self):
+        return self.client[self.db_name]
+
+    def ping(self):
+        """Readiness probe: True when the server answers within the selection timeout."""
+        try:
+            self.client.admin.command("ping")
+            return True
+        except Exception:
+            return False
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            if not self._injected:
+                self._client = None
+
+
+def ensure_indexes(db):
+    """Create the indexes the routes rely on (idempotent)."""
+    db["incidents"].create_index("report_id", unique=True, sparse=True)
+    db["incidents"].create_index("cluster_cell")
+    db["incidents"].create_index("group_id")
+    db["incidents"].create_index([("severity", -1)])
+    if "priority_-1" in db["incidents"].index_information():
+        # Replaced by severity (the age term is no longer part of the stored key)
+        db["incidents"].drop_index("priority_-1")
+    db["case_status"].create_index([("incident_id", 1), ("hospital_name", 1)])
+    db["ambulances"].create_index("hospital_name")
+    db["ambulances"].create_index("current_incident_id")
+    db["resolved_cases"].create_index("hospital_name")
+    db["hospital_user"].create_index("email")
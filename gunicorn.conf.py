@@ -0,0 +1,39 @@
+"""
+gunicorn settings for SwiftAid, driven by the env variables in config.py.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from config import (
+    BIND, GRACEFUL_TIMEOUT, GUNICORN_THREADS, GUNICORN_TIMEOUT, KEEPALIVE, MAX_REQUESTS, WEB_CONCURRENCY,
+)
+
+# NB: every lowercase module-level name here is read as a gunicorn setting
+bind = BIND
+workers = WEB_CONCURRENCY
+worker_class = "gthread"
+threads = GUNICORN_THREADS
+timeout = GUNICORN_TIMEOUT
+graceful_timeout = GRACEFUL_TIMEOUT
+keepalive = KEEPALIVE
+max_requests = MAX_REQUESTS
+max_requests_jitter = MAX_REQUESTS // 10
+
+# Never share a MongoClient across fork: load the app inside each worker
+preload_app = False
+
+
+def worker_exit(server, worker):
+    """
+    On SIGTERM/SIGQUIT the worker drains in-flight requests, then flushes the traffic capture
+    and buffered GPS positions and closes its Mongo pool.
+    """
+    extensions = getattr(getattr(worker, "wsgi", None), "extensions", {})
+    recorder = extensions.get("traffic_recorder")
+    if recorder is not None:
+        recorder.close()
+    positions = extensions.get("positions")
+    if positions is not None:
+        positions.close()
+    mongo = extensions.get("mongo")
+    if mongo is not None:
+        mongo.close()
@@ -0,0 +1,237 @@
+"""
+Validation and normalization of crash reports and ambulance GPS pings sent by the mobile/IoT clients.
+
+Reports are normalized once, at write time, into the shape every reader
+expects (lat, lng, speed, accel_mag, user_email, metadata.created_at).
+The mobile app still inserts some incidents directly, so the pages keep
+patching missing fields at read time (with_read_defaults) until every
+writer goes through /api/incidents/batch and the backfill has run.
+"""
+import math
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+import config
+
+MAX_METADATA_KEYS = 32
+
+
+def _number(raw, name, errors, default=None, minimum=None, maximum=None):
+    if raw is None or raw == "":
+        if default is None:
+            errors.append(f"{name} is required")
+        return default
+    if isinstance(raw, bool):
+        errors.append(f"{name} must be a number")
+        return None
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        errors.append(f"{name} must be a number")
+        return None
+    if not math.isfinite(value):
+        errors.append(f"{name} must be finite")
+        return None
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        errors.append(f"{name} must be between {minimum} and {maximum}" if maximum is not None
+                      else f"{name} must be at least {minimum}")
+        return None
+    return value
+
+
+def parse_timestamp(raw, now):
+    """ISO-8601 string, epoch seconds or epoch milliseconds → naive UTC datetime (like datetime.utcnow())."""
+    if raw is None or raw == "":
+        return now
+    if isinstance(raw, datetime):
+        value = raw
+    elif isinstance(raw, (int, float)) and not isinstance(raw, bool):
+        seconds = raw / 1000 if raw > 1e11 else raw
+        value = datetime.fromtimestamp(seconds, timezone.utc)
+    elif isinstance(raw, str):
+        value = datetime.fromisoformat(raw.strip().replace("Z", "+00:00"))
+    else:
+        raise ValueError("unsupported timestamp")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def normalize_incident(raw, now=None, defaults=None, max_age_s=None):
+    """
+    Validate one report. Returns (document, errors); document is None when errors is non-empty.
+    `defaults` supplies values for missing required fields and `max_age_s` (INGEST_MAX_REPORT_AGE_S
+    by default) bounds created_at; the backfill of legacy rows passes both.
+    """
+    now = now or datetime.utcnow()
+    defaults = defaults or {}
+    max_age_s = config.INGEST_MAX_REPORT_AGE_S if max_age_s is None else max_age_s
+    errors = []
+    if not isinstance(raw, dict):
+        return None, ["report must be a JSON object"]
+
+    lat = _number(raw.get("lat", defaults.get("lat")), "lat", errors, minimum=-90, maximum=90)
+    lng = _number(raw.get("lng", defaults.get("lng")), "lng", errors, minimum=-180, maximum=180)
+    speed = _number(raw.get("speed"), "speed", errors, default=0.0, minimum=0)
+    accel_mag = _number(raw.get("accel_mag"), "accel_mag", errors, default=0.0, minimum=0)
+
+    user_email = raw.get("user_email") or "Unknown"
+    if not isinstance(user_email, str) or len(user_email) > 254:
+        errors.append("user_email must be a string")
+
+    metadata = raw.get("metadata") or {}
+    if not isinstance(metadata, dict) or len(metadata) > MAX_METADATA_KEYS:
+        errors.append("metadata must be an object")
+        metadata = {}
+    try:
+        created_at = parse_timestamp(metadata.get("created_at", raw.get("created_at")), now)
+    except (ValueError, OverflowError, OSError):
+        errors.append("created_at must be an ISO-8601 string or epoch timestamp")
+        created_at = None
+    if created_at is not None:
+        # A client clock cannot date a report far into the past or future
+        if created_at > now + timedelta(seconds=config.INGEST_MAX_CLOCK_SKEW_S):
+            errors.append("created_at is in the future")
+        elif (now - created_at).total_seconds() > max_age_s:
+            errors.append(f"created_at is more than {max_age_s:g} seconds old")
+        created_at = min(created_at, now)
+
+    if errors:
+        return None, errors
+
+    doc = {
+        "user_email": user_email.strip(),
+        "lat": lat,
+        "lng": lng,
+        "speed": speed,
+        "accel_mag": accel_mag,
+        "metadata": {**metadata, "created_at": created_at, "ingested_at": now},
+    }
+    if raw.get("report_id") is not None:
+        doc["report_id"] = str(raw["report_id"])
+    return doc, []
+
+
+def normalize_batch(reports, now=None):
+    """Returns (documents, their indexes in `reports`, [{"index", "errors"}])."""
+    now = now or datetime.utcnow()
+    docs, positions, failures = [], [], []
+    for index, raw in enumerate(reports):
+        doc, errors = normalize_incident(raw, now)
+        if errors:
+            failures.append({"index": index, "errors": errors})
+        else:
+            docs.append(doc)
+            positions.append(index)
+    return docs, positions, failures
+
+
+def normalize_position(raw, now=None):
+    """
+    Validate one ambulance GPS ping. Returns (ambulance_id, position, errors).
+    recorded_at is clamped to `now` so a skewed device clock cannot pin a stale fix as the newest.
+    """
+    now = now or datetime.utcnow()
+    errors = []
+    if not isinstance(raw, dict):
+        return None, None, ["position must be a JSON object"]
+
+    ambulance_id = raw.get("ambulance_id")
+    if not isinstance(ambulance_id, str) or not ObjectId.is_valid(ambulance_id):
+        errors.append("ambulance_id must be an ambulance id")
+    lat = _number(raw.get("lat"), "lat", errors, minimum=-90, maximum=90)
+    lng = _number(raw.get("lng"), "lng", errors, minimum=-180, maximum=180)
+    speed = _number(raw.get("speed"), "speed", errors, default=0.0, minimum=0)
+    heading = None
+    if raw.get("heading") not in (None, ""):
+        heading = _number(raw["heading"], "heading", errors, minimum=0, maximum=360)
+    try:
+        recorded_at = min(parse_timestamp(raw.get("recorded_at"), now), now)
+    except (ValueError, OverflowError, OSError):
+        errors.append("recorded_at must be an ISO-8601 string or epoch timestamp")
+        recorded_at = None
+
+    if errors:
+        return None, None, errors
+
+    position = {"lat": lat, "lng": lng, "speed": speed, "recorded_at": recorded_at}
+    if heading is not None:
+        position["heading"] = heading
+    return ambulance_id, position, []
+
+
+def drop_retried_reports(collection, docs, positions):
+    """Drop reports whose report_id is already stored or repeated in the batch (one $in lookup)."""
+    report_ids = [doc["report_id"] for doc in docs if "report_id" in doc]
+    if not report_ids:
+        return docs, positions, []
+    seen = {d["report_id"] for d in collection.find({"report_id": {"$in": report_ids}}, {"report_id": 1})}
+    kept_docs, kept_positions, failures = [], [], []
+    for doc, position in zip(docs, positions):
+        report_id = doc.get("report_id")
+        if report_id is not None and report_id in seen:
+            failures.append({"index": position, "errors": ["duplicate report_id"]})
+            continue
+        if report_id is not None:
+            seen.add(report_id)
+        kept_docs.append(doc)
+        kept_positions.append(position)
+    return kept_docs, kept_positions, failures
+
+
+def insert_reports(collection, docs, positions):
+    """Unordered insert_many. Returns ({batch index: _id}, per-item failures)."""
+    if not docs:
+        return {}, []
+    try:
+        result = collection.insert_many(docs, ordered=False)
+        return dict(zip(positions, result.inserted_ids)), []
+    except BulkWriteError as e:
+        failed = {err["index"]: err for err in e.details.get("writeErrors", [])}
+        inserted, failures = {}, []
+        for i, position in enumerate(positions):
+            if i in failed:
+                reason = "duplicate report_id" if failed[i].get("code") == 11000 else failed[i].get("errmsg")
+                failures.append({"index": position, "errors": [reason]})
+            else:
+                inserted[position] = docs[i]["_id"]
+        return inserted, failures
+
+
+# Read-time defaults for rows written without validation (legacy rows and direct inserts)
+LEGACY_DEFAULTS = {"lat": 14.4663, "lng": 75.9219}
+READ_DEFAULTS = {**LEGACY_DEFAULTS, "user_email": "Unknown", "speed": 0, "accel_mag": 0}
+LEGACY_QUERY = {"$or": [
+    {"lat": {"$exists": False}}, {"lng": {"$exists": False}}, {"speed": {"$exists": False}},
+    {"accel_mag": {"$exists": False}}, {"user_email": {"$exists": False}},
+    {"metadata.created_at": {"$exists": False}},
+]}
+
+
+def with_read_defaults(doc):
+    """Fill the fields the pages render on a row stored without them (in place)."""
+    for field, value in READ_DEFAULTS.items():
+        if doc.get(field) is None:
+            doc[field] = value
+    metadata = doc.get("metadata")
+    doc["metadata"] = {"created_at": "N/A", **(metadata if isinstance(metadata, dict) else {})}
+    return doc
+
+
+def backfill_incidents(collection):
+    """Normalize legacy incidents in place. Returns (updated, skipped)."""
+    updated = skipped = 0
+    for doc in collection.find(LEGACY_QUERY):
+        metadata = dict(doc.get("metadata") or {})
+        metadata.setdefault("created_at", doc["_id"].generation_time)
+        normalized, errors = normalize_incident({**doc, "metadata": metadata}, defaults=LEGACY_DEFAULTS,
+                                                max_age_s=math.inf)
+        if errors:
+            skipped += 1
+            continue
+        normalized["metadata"].pop("ingested_at")
+        collection.update_one({"_id": doc["_id"]}, {"$set": normalized})
+        updated += 1
+    return updated, skipped
@@ -0,0 +1,112 @@
+"""
+Structured, non-blocking logging.
+
+Records are formatted as one JSON object per line, but request threads only
+enqueue them: a QueueHandler on the root logger hands records to a
+QueueListener thread that does the actual stdout I/O.
+
+    LOG_LEVEL=INFO                                  root level
+    LOG_LEVELS=swiftaid.search=DEBUG,pymongo=WARNING  per-logger overrides
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+
+import config
+
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_lock = threading.Lock()
+_listener = None
+_listener_pid = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; `extra=` fields are emitted as top-level keys."""
+
+    def format(self, record):
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """Like QueueHandler, but keeps the traceback out of `msg` so it stays its own JSON field."""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_levels(spec):
+    """'a=DEBUG,b.c=WARNING' -> {'a': 'DEBUG', 'b.c': 'WARNING'}"""
+    levels = {}
+    for item in (spec or "").split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level=None, levels=None, stream=None):
+    """
+    Install the queue-based JSON pipeline once per process.
+    Safe to call from every create_app(); after fork the listener thread is restarted.
+    """
+    global _listener, _listener_pid
+    with _lock:
+        if _listener is not None and _listener_pid == os.getpid():
+            return _listener
+
+        handler = logging.StreamHandler(stream or sys.stdout)
+        handler.setFormatter(JsonFormatter())
+
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        for old in [h for h in root.handlers if isinstance(h, logging.handlers.QueueHandler)]:
+            root.removeHandler(old)
+        root.addHandler(StructuredQueueHandler(log_queue))
+        root.setLevel(level or config.LOG_LEVEL)
+        for name, logger_level in {**parse_levels(config.LOG_LEVELS), **(levels or {})}.items():
+            logging.getLogger(name).setLevel(logger_level)
+
+        _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        _listener_pid = os.getpid()
+        return _listener
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener, _listener_pid
+    with _lock:
+        if _listener is not None and _listener_pid == os.getpid():
+            _listener.stop()
+        _listener = None
+        _listener_pid = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,173 @@
+"""
+Request latency and Mongo round-trip instrumentation.
+
+Flask before/after hooks time every request; a PyMongo CommandListener
+attributes each command (count and duration) to the route that issued it.
+Everything is exposed as Prometheus text at /metrics. Counters are
+per-process, so under gunicorn each worker reports its own series.
+
+Set SLOW_REQUEST_MS to log requests slower than that with their per-command breakdown.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from flask import Response, g, request
+from pymongo import monitoring
+
+import config
+
+logger = logging.getLogger("swiftaid.metrics")
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COMMAND_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+_current_trace = ContextVar("swiftaid_request_trace", default=None)
+
+
+def current_trace():
+    """The RequestTrace of the request running in this context, or None."""
+    return _current_trace.get()
+
+
+class Histogram:
+    """Minimal labelled Prometheus histogram."""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+            for labels, (counts, total, count) in items:
+                label_str = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.label_names, labels))
+                sep = "," if label_str else ""
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{{{label_str}{sep}le="{bound}"}} {bucket_count}')
+                lines.append(f'{self.name}_bucket{{{label_str}{sep}le="+Inf"}} {count}')
+                lines.append(f"{self.name}_sum{{{label_str}}} {total}")
+                lines.append(f"{self.name}_count{{{label_str}}} {count}")
+        return "\n".join(lines)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RequestTrace:
+    """Mongo commands issued while serving one request."""
+
+    __slots__ = ("route", "commands")
+
+    def __init__(self, route):
+        self.route = route
+        self.commands = []  # (command_name, seconds, ok)
+
+    def breakdown(self):
+        summary = {}
+        for name, seconds, ok in self.commands:
+            entry = summary.setdefault(name, {"count": 0, "ms": 0.0, "failed": 0})
+            entry["count"] += 1
+            entry["ms"] += seconds * 1000
+            entry["failed"] += 0 if ok else 1
+        for entry in summary.values():
+            entry["ms"] = round(entry["ms"], 2)
+        return summary
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Attributes every command to the request running on the same thread/context."""
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, True)
+
+    def failed(self, event):
+        self._record(event, False)
+
+    def _record(self, event, ok):
+        seconds = event.duration_micros / 1e6
+        trace = current_trace()
+        route = trace.route if trace else "<background>"
+        if trace is not None:
+            trace.commands.append((event.command_name, seconds, ok))
+        self.registry.mongo_command_seconds.observe((route, event.command_name, "ok" if ok else "error"), seconds)
+
+
+class MetricsRegistry:
+    def __init__(self, slow_request_ms=None):
+        self.slow_request_ms = config.SLOW_REQUEST_MS if slow_request_ms is None else slow_request_ms
+        self.request_seconds = Histogram(
+            "swiftaid_http_request_duration_seconds", "HTTP request latency.",
+            ("route", "method", "status"), REQUEST_BUCKETS)
+        self.mongo_command_seconds = Histogram(
+            "swiftaid_mongo_command_duration_seconds", "MongoDB command round-trip time.",
+            ("route", "command", "outcome"), COMMAND_BUCKETS)
+        self.mongo_commands_per_request = Histogram(
+            "swiftaid_mongo_commands_per_request", "MongoDB commands issued per HTTP request.",
+            ("route",), COUNT_BUCKETS)
+        self.command_listener = MongoCommandListener(self)
+
+    def init_app(self, app):
+        app.extensions["metrics"] = self
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule("/metrics", "metrics", self.render_response)
+
+    def _before_request(self):
+        trace = RequestTrace(request.endpoint or "<unmatched>")
+        g._metrics_trace_token = _current_trace.set(trace)
+        g._metrics_started = time.perf_counter()
+
+    def _after_request(self, response):
+        trace = current_trace()
+        started = g.get("_metrics_started")
+        if trace is None or started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        self.request_seconds.observe((trace.route, request.method, str(response.status_code)), elapsed)
+        self.mongo_commands_per_request.observe((trace.route,), len(trace.commands))
+        if self.slow_request_ms and elapsed * 1000 >= self.slow_request_ms:
+            logger.warning(
+                "slow request %s %s %.1fms mongo_ops=%d breakdown=%s",
+                request.method, request.path, elapsed * 1000, len(trace.commands), trace.breakdown(),
+            )
+        return response
+
+    def _teardown_request(self, exc):
+        token = g.pop("_metrics_trace_token", None)
+        if token is not None:
+            _current_trace.reset(token)
+
+    def render(self):
+        parts = [self.request_seconds.render(), self.mongo_command_seconds.render(),
+                 self.mongo_commands_per_request.render()]
+        return "\n".join(parts) + "\n"
+
+    def render_response(self):
+        return Response(self.render(), mimetype="text/plain; version=0.0.4")
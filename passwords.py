@@ -0,0 +1,129 @@
+"""
+Password hashing off the request thread, and login throttling.
+
+werkzeug's hashes are deliberately slow (scrypt by default, ~100 ms of CPU
+each). Run inline, a login storm at shift change or a credential-stuffing
+run has every request thread hashing at once and the dashboard stalls.
+Hashing therefore goes through a small per-worker pool (PASSWORD_HASH_WORKERS
+threads; hashlib releases the GIL while it hashes) with a bounded backlog:
+when PASSWORD_HASH_QUEUE jobs are already waiting, the login is refused
+with 503 instead of queueing more CPU work.
+
+In front of that, token buckets per client IP and per email refuse
+excess attempts with 429 before any hashing happens. Buckets live in each
+worker's memory, so the effective limit scales with WEB_CONCURRENCY. Behind
+a reverse proxy, set TRUSTED_PROXY_HOPS so the IP bucket is the client's
+address from X-Forwarded-For rather than one bucket shared by everyone.
+
+Stored hashes made with an older PASSWORD_HASH_METHOD are re-hashed on the
+next successful login.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+import config
+from process_local import ProcessLocal
+
+
+class HashPoolBusy(RuntimeError):
+    """The hashing backlog is full (or a job timed out); the caller should answer 503."""
+
+
+class HashPool:
+    def __init__(self, workers=None, backlog=None, timeout=None, method=None):
+        self.workers = workers or config.PASSWORD_HASH_WORKERS
+        self.backlog = config.PASSWORD_HASH_QUEUE if backlog is None else backlog
+        self.timeout = timeout or config.PASSWORD_HASH_TIMEOUT
+        self.method = method or config.PASSWORD_HASH_METHOD
+        self._slots = threading.BoundedSemaphore(self.workers + self.backlog)
+        self._executor = ProcessLocal(lambda: ThreadPoolExecutor(self.workers, thread_name_prefix="password-hash"))
+        self._prefix = None
+        # Checked for unknown emails so a miss costs the same as a wrong password
+        self._dummy_hash = None
+
+    def init_app(self, app):
+        app.extensions["hash_pool"] = self
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashPoolBusy("password hashing backlog is full")
+        try:
+            future = self._executor.get().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HashPoolBusy("password hashing timed out") from None
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def method_prefix(self):
+        """The parameter prefix ("scrypt:32768:8:1") PASSWORD_HASH_METHOD writes, defaults spelled out."""
+        if self._prefix is None:
+            self._dummy_hash = self.hash("")
+            self._prefix = self._dummy_hash.split("$", 1)[0]
+        return self._prefix
+
+    def verify(self, stored_hash, password):
+        """Returns (matches, needs_rehash). Pass stored_hash=None for an unknown account."""
+        prefix = self.method_prefix()
+        if not stored_hash:
+            self._run(check_password_hash, self._dummy_hash, password)
+            return False, False
+        if not self._run(check_password_hash, stored_hash, password):
+            return False, False
+        return True, stored_hash.split("$", 1)[0] != prefix
+
+
+class TokenBucket:
+    """Per-key token buckets (burst `capacity`, refilled at `per_minute`); least recently used keys are dropped."""
+
+    # Longest wait reported, so a zero refill rate still yields a usable Retry-After
+    MAX_WAIT_S = 3600
+
+    def __init__(self, capacity, per_minute, max_keys=100_000):
+        self.capacity = capacity
+        self.rate = per_minute / 60.0
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, now=None):
+        """Spend one token for `key`. Returns 0 when allowed, else the seconds until one is available."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        if allowed:
+            return 0
+        return min((1 - tokens) / self.rate, self.MAX_WAIT_S) if self.rate else self.MAX_WAIT_S
+
+
+class LoginThrottle:
+    def __init__(self):
+        self.by_ip = TokenBucket(config.LOGIN_IP_BURST, config.LOGIN_IP_PER_MINUTE)
+        self.by_email = TokenBucket(config.LOGIN_EMAIL_BURST, config.LOGIN_EMAIL_PER_MINUTE)
+
+    def init_app(self, app):
+        app.extensions["login_throttle"] = self
+
+    def check(self, ip, email):
+        """Seconds the client must wait before this attempt would be allowed (0 = go ahead)."""
+        wait = self.by_ip.take(ip or "-")
+        if wait:
+            return wait
+        return self.by_email.take(email)
@@ -0,0 +1,123 @@
+"""
+Write-behind buffer for ambulance GPS pings.
+
+Devices ping every second or two; writing each ping to `ambulances` would
+make fleet tracking the busiest write path in the app. Pings land in an
+in-memory latest-position store instead: a newer fix for the same ambulance
+replaces the buffered one, and a background thread writes whatever changed
+every POSITION_FLUSH_S as one unordered bulk_write (one update per moving
+ambulance, however many pings arrived in between).
+
+The store is per worker and only feeds the flush: /ambulances reads MongoDB
+alone, so every worker (and the async app) serves the same bytes under one
+strong ETag, at most one flush interval behind the devices. Each flush bumps
+the owning hospitals' position stamps (versions.position_scope) to move those
+ETags on. A flush only replaces an older stored fix, so workers flushing out
+of order never move an ambulance backwards.
+"""
+import atexit
+import logging
+import threading
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+import config
+import versions
+from process_local import ProcessLocal
+
+logger = logging.getLogger("swiftaid.positions")
+
+
+class PositionBuffer:
+    def __init__(self, interval=None):
+        self.interval = interval or config.POSITION_FLUSH_S
+        self._mongo = None
+        self._lock = threading.Lock()
+        self._latest = {}     # ambulance id → newest fix this worker has seen
+        self._dirty = {}      # ambulance id → fix not flushed yet
+        self._hospitals = {}  # ambulance id → hospital_name, for the position stamps
+        self._flusher = ProcessLocal(self._start_flusher)
+        self.stats = {"pings": 0, "stale": 0, "coalesced": 0, "flushes": 0, "written": 0, "errors": 0}
+
+    def init_app(self, app):
+        self._mongo = app.extensions["mongo"]
+        app.extensions["positions"] = self
+        atexit.register(self.close)
+
+    def known_ambulances(self, ids):
+        """{id: hospital_name} for the ids that are stored ambulances (one $in query for ids not seen before)."""
+        missing = [ambulance_id for ambulance_id in set(ids) if ambulance_id not in self._hospitals]
+        if missing:
+            query = {"_id": {"$in": [ObjectId(ambulance_id) for ambulance_id in missing]}}
+            for amb in self._mongo.db["ambulances"].find(query, {"hospital_name": 1}):
+                self._hospitals[str(amb["_id"])] = amb.get("hospital_name")
+        return {ambulance_id: self._hospitals[ambulance_id] for ambulance_id in ids if ambulance_id in self._hospitals}
+
+    def record(self, ambulance_id, position):
+        """Buffer a fix. Returns False when this worker already holds one at least as recent."""
+        self._flusher.get()
+        with self._lock:
+            self.stats["pings"] += 1
+            current = self._latest.get(ambulance_id)
+            if current is not None and current["recorded_at"] >= position["recorded_at"]:
+                self.stats["stale"] += 1
+                return False
+            if ambulance_id in self._dirty:
+                self.stats["coalesced"] += 1
+            self._latest[ambulance_id] = position
+            self._dirty[ambulance_id] = position
+        return True
+
+    def flush(self):
+        """Write every buffered fix in one bulk_write. Returns the number of ambulances sent."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return 0
+
+        ops = [
+            UpdateOne(
+                {"_id": ObjectId(ambulance_id),
+                 "$or": [{"position": None}, {"position.recorded_at": {"$lt": fix["recorded_at"]}}]},
+                {"$set": {"position": fix}},
+            )
+            for ambulance_id, fix in dirty.items()
+        ]
+        hospitals = {self._hospitals.get(ambulance_id) for ambulance_id in dirty} - {None}
+        try:
+            self._mongo.db["ambulances"].bulk_write(ops, ordered=False)
+            versions.bump_stamps(self._mongo.db, sorted(versions.position_scope(h) for h in hospitals))
+        except Exception:
+            logger.exception("Position flush failed", extra={"ambulances": len(dirty)})
+            with self._lock:
+                # Retry next round unless a newer fix arrived meanwhile
+                for ambulance_id, fix in dirty.items():
+                    self._dirty.setdefault(ambulance_id, fix)
+                self.stats["errors"] += 1
+            return 0
+
+        with self._lock:
+            self.stats["flushes"] += 1
+            self.stats["written"] += len(dirty)
+        return len(dirty)
+
+    def _start_flusher(self):
+        stopping = threading.Event()
+        thread = threading.Thread(target=self._flush_loop, args=(stopping,), name="position-flush", daemon=True)
+        thread.start()
+        return stopping, thread
+
+    def _flush_loop(self, stopping):
+        while not stopping.wait(self.interval):
+            self.flush()
+
+    def close(self):
+        """Stop the flush thread and write out whatever is still buffered."""
+        flusher = self._flusher.pop()
+        if flusher is not None:
+            stopping, thread = flusher
+            stopping.set()
+            thread.join(timeout=5)
+        if self._mongo is not None:
+            self.flush()
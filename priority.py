@@ -0,0 +1,177 @@
+"""
+Severity scoring and the priority-ordered incident queue.
+
+    score = SPEED_WEIGHT * speed + ACCEL_WEIGHT * accel_mag
+          + AGE_WEIGHT * min(minutes waiting, AGE_CAP_MIN)
+          - DISTANCE_WEIGHT * min(km from the hospital, DISTANCE_CAP_KM)
+
+Minutes waiting count from metadata.ingested_at, the server's clock, so a
+client-supplied created_at cannot buy rank. The age bonus is capped: a case
+that has waited AGE_CAP_MIN gains no more, so old reports never outrank a
+fresh severe crash by age alone (and accepted cases leave the queue).
+
+The severity terms never change, so they are stored once, at write time, as
+the indexed `severity` field. The age and distance terms are both bounded,
+so top_k() walks the severity index in descending order, scores each chunk
+with NumPy, and stops as soon as no unread row can beat the current k-th
+score (its severity plus the largest age bonus) instead of scoring the
+whole collection.
+"""
+from datetime import datetime, timezone
+from itertools import islice
+
+import numpy as np
+from bson import ObjectId
+
+import config
+from clustering import EARTH_RADIUS_M, PRIMARY_FILTER
+from ingest import parse_timestamp
+
+
+def _waiting_since(doc):
+    """
+    When the report reached the server (aware UTC). Rows inserted directly have no ingested_at;
+    they fall back to a parseable metadata.created_at, then to the _id time.
+    """
+    metadata = doc.get("metadata")
+    metadata = metadata if isinstance(metadata, dict) else {}
+    for raw in (metadata.get("ingested_at"), metadata.get("created_at")):
+        try:
+            stamp = parse_timestamp(raw, None)
+        except (ValueError, OverflowError, OSError):
+            stamp = None
+        if stamp is not None:
+            return stamp.replace(tzinfo=timezone.utc)  # parse_timestamp returns naive UTC
+    return doc["_id"].generation_time
+
+
+def age_bonus(docs, now_minutes):
+    """AGE_WEIGHT points per minute waiting, capped at AGE_CAP_MIN minutes."""
+    since = np.array([_waiting_since(doc).timestamp() for doc in docs], dtype=float) / 60
+    return config.PRIORITY_AGE_WEIGHT * np.clip(now_minutes - since, 0, config.PRIORITY_AGE_CAP_MIN)
+
+
+def _number(value):
+    try:
+        return float(value or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _column(docs, field):
+    return np.array([_number(doc.get(field)) for doc in docs], dtype=float)
+
+
+def priority_keys(docs):
+    """The time-invariant part of the score (the stored `severity`) for a batch of incidents."""
+    return (config.PRIORITY_SPEED_WEIGHT * _column(docs, "speed")
+            + config.PRIORITY_ACCEL_WEIGHT * _column(docs, "accel_mag"))
+
+
+def assign_priority(docs):
+    """Set `severity` on normalized incidents before they are written."""
+    if docs:
+        for doc, key in zip(docs, priority_keys(docs)):
+            doc["severity"] = float(key)
+
+
+def _store_keys(collection, docs):
+    """Compute and save `severity` for stored incidents that have none. Returns the keys."""
+    keys = priority_keys(docs) if docs else np.empty(0)
+    for doc, key in zip(docs, keys):
+        doc["severity"] = float(key)
+        collection.update_one({"_id": doc["_id"], "severity": None}, {"$set": {"severity": doc["severity"]}})
+    return keys
+
+
+def backfill_priority(collection):
+    """
+    Score incidents stored without a `severity`. Returns the number updated.
+    Also drops the age-dependent `priority` key earlier versions stored.
+    """
+    docs = list(collection.find({"severity": None}, {"speed": 1, "accel_mag": 1}))
+    _store_keys(collection, docs)
+    collection.update_many({"priority": {"$exists": True}}, {"$unset": {"priority": ""}})
+    return len(docs)
+
+
+def hospital_origin(user):
+    """(lat, lng) stored for a hospital account, or None when it has no coordinates."""
+    lat, lng = (user or {}).get("lat"), (user or {}).get("lng")
+    if isinstance(lat, (int, float)) and isinstance(lng, (int, float)):
+        return float(lat), float(lng)
+    return None
+
+
+def distance_km(docs, origin):
+    lat = np.radians(np.array([doc.get("lat", np.nan) for doc in docs], dtype=float))
+    lng = np.radians(np.array([doc.get("lng", np.nan) for doc in docs], dtype=float))
+    lat0, lng0 = np.radians(origin[0]), np.radians(origin[1])
+    a = np.sin((lat - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lat) * np.sin((lng - lng0) / 2) ** 2
+    # Rows without a position pay no distance penalty
+    return np.nan_to_num(2 * EARTH_RADIUS_M / 1000 * np.arcsin(np.sqrt(np.minimum(a, 1.0))))
+
+
+def score(docs, keys, origin, now_minutes):
+    scores = keys + age_bonus(docs, now_minutes) if docs else keys
+    if origin is not None and docs:
+        scores = scores - config.PRIORITY_DISTANCE_WEIGHT * np.minimum(
+            distance_km(docs, origin), config.PRIORITY_DISTANCE_CAP_KM)
+    return scores
+
+
+def _keep_best(docs, scores, k):
+    if len(docs) <= k:
+        return docs, scores
+    best = np.argpartition(-scores, k - 1)[:k]
+    return [docs[i] for i in best], scores[best]
+
+
+def top_k(collection, k, origin=None, now=None, query=PRIMARY_FILTER, include=(), exclude=()):
+    """
+    The k most urgent incidents matching `query`, each with a `score`, most urgent first.
+    Incident ids in `exclude` (accepted cases) are skipped; ids in `include` are always
+    returned as well, ranked among the others.
+    """
+    now_minutes = (now or datetime.utcnow()).replace(tzinfo=timezone.utc).timestamp() / 60
+    skipped = [ObjectId(i) for i in exclude if ObjectId.is_valid(i)]
+    if skipped:
+        query = {**query, "_id": {"$nin": skipped}}
+
+    # Rows inserted without a key (legacy rows, direct inserts) get one first, then join the index walk
+    _store_keys(collection, list(collection.find({**query, "severity": None}, {"speed": 1, "accel_mag": 1})))
+
+    docs, scores = [], np.empty(0)
+
+    chunk = max(2 * k, 64)
+    max_age_bonus = config.PRIORITY_AGE_WEIGHT * config.PRIORITY_AGE_CAP_MIN
+    cursor = collection.find({**query, "severity": {"$ne": None}}).sort("severity", -1).batch_size(chunk)
+    try:
+        while True:
+            batch = list(islice(cursor, chunk))
+            if not batch:
+                break
+            keys = np.array([doc["severity"] for doc in batch], dtype=float)
+            docs, scores = _keep_best(docs + batch, np.concatenate([scores, score(batch, keys, origin, now_minutes)]), k)
+            # Every unread row scores at most its severity plus the largest age bonus
+            if len(batch) < chunk or (len(docs) == k and keys[-1] + max_age_bonus <= scores.min()):
+                break
+    finally:
+        cursor.close()
+
+    seen = {doc["_id"] for doc in docs}
+    extra = {ObjectId(i) for i in include if ObjectId.is_valid(i)} - seen
+    if extra:
+        pinned = list(collection.find({"_id": {"$in": sorted(extra)}}))
+        keys = np.array([doc.get("severity") for doc in pinned], dtype=float)
+        missing = np.isnan(keys)
+        if missing.any():
+            keys[missing] = priority_keys([doc for doc, m in zip(pinned, missing) if m])
+        docs = docs + pinned
+        scores = np.concatenate([scores, score(pinned, keys, origin, now_minutes)])
+
+    order = np.argsort(-scores, kind="stable")
+    ranked = [docs[i] for i in order]
+    for doc, value in zip(ranked, scores[order]):
+        doc["score"] = round(float(value), 1)
+    return ranked
@@ -0,0 +1,37 @@
+"""
+Per-process lazy values for background threads and pools.
+
+gunicorn forks its workers, and threads do not survive a fork. Anything that
+owns a thread (the traffic writer, the GPS flush loop, the password hashing
+pool) is therefore built on first use, in the process that uses it, and built
+again if that process turns out to be a fork of the one that built it.
+"""
+import os
+import threading
+
+
+class ProcessLocal:
+    """The value `factory()` returns, built once per process on the first get()."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._value = None
+        self._pid = None
+
+    def get(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # Published only once built, so a concurrent get() never sees a half-made value
+                    self._value = self._factory()
+                    self._pid = os.getpid()
+        return self._value
+
+    def pop(self):
+        """The value built in this process, forgotten so the next get() builds a new one (None if none)."""
+        with self._lock:
+            if self._pid != os.getpid():
+                return None
+            value, self._value, self._pid = self._value, None, None
+            return value
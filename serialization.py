@@ -0,0 +1,89 @@
+"""
+Pluggable JSON serialization for Flask and Quart.
+
+JSON_SERIALIZER=orjson (the default when orjson is installed) encodes
+responses and `|tojson` straight to bytes; "stdlib" keeps the json module.
+Both handle ObjectId and datetime natively, so routes can hand raw Mongo
+documents to jsonify() without per-document conversion loops.
+"""
+import json
+from datetime import date, datetime
+
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+import config
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def json_default(obj):
+    """Types neither encoder knows natively."""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if hasattr(obj, "tolist"):  # NumPy scalars / arrays
+        return obj.tolist()
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def use_orjson(name=None):
+    name = (name or config.JSON_SERIALIZER).lower()
+    if name == "stdlib":
+        return False
+    if name == "orjson" and orjson is None:
+        raise RuntimeError("JSON_SERIALIZER=orjson but orjson is not installed")
+    return orjson is not None
+
+
+class JSONProviderMixin:
+    """dumps()/response() via orjson when enabled, else stdlib json with the same default()."""
+
+    fast = False
+    default = staticmethod(json_default)
+    sort_keys = False
+    ensure_ascii = False
+
+    def dumps_bytes(self, obj):
+        if self.fast:
+            return orjson.dumps(obj, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(obj, default=json_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def dumps(self, obj, **kwargs):
+        # Jinja's |tojson passes sort_keys; key order carries no meaning for our payloads
+        kwargs.pop("sort_keys", None)
+        if self.fast and not kwargs:
+            return self.dumps_bytes(obj).decode()
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.fast and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+
+
+class FastJSONProvider(JSONProviderMixin, DefaultJSONProvider):
+    pass
+
+
+def init_json(app, serializer=None):
+    """Install the configured JSON provider on a Flask or Quart app."""
+    if app.__class__.__module__.startswith("quart"):
+        from quart.json.provider import DefaultJSONProvider as QuartJSONProvider
+        base = type("QuartFastJSONProvider", (JSONProviderMixin, QuartJSONProvider), {})
+    else:
+        base = FastJSONProvider
+    provider_class = type(base.__name__, (base,), {"fast": use_orjson(serializer)})
+    app.json_provider_class = provider_class
+    app.json = provider_class(app)
+    return app.json
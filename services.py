@@ -0,0 +1,28 @@
+"""
+Business rules shared by the sync Flask app (app.py) and the asyncio variant (asgi_app.py).
+
+Everything here is pure: functions take documents and return the queries /
+updates to run, so each app only has to issue them with its own driver.
+"""
+
+
+def reconcile_ambulance(amb):
+    """
+    Derive an ambulance's status from its current_incident_id (in place).
+    Returns the $set update needed to bring the stored record in line, or None.
+    """
+    update = None
+    if not amb.get("current_incident_id"):
+        # No case → mark available
+        if amb.get("status") != "available":
+            update = {"status": "available", "current_incident_id": None}
+        amb["status"] = "available"
+        amb["assigned_case"] = False
+    else:
+        # Has assigned case → ensure on-duty and lock it
+        if amb.get("status") != "on-duty":
+            update = {"status": "on-duty"}
+        amb["status"] = "on-duty"
+        amb["assigned_case"] = True
+    return update
+
@@ -30,24 +30,89 @@ document.addEventListener("DOMContentLoaded", () => {
     });
 
     // ===== Leaflet Map =====
-    if (typeof incidentsData !== "undefined" && incidentsData.length > 0) {
+    // Markers come pre-clustered from the server for the visible area only
+    if (document.getElementById("map") && typeof L !== "undefined") {
         const map = L.map("map").setView([14.4663, 75.9219], 12);
         L.tileLayer("https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png", {
             maxZoom: 19,
             attribution: "© OpenStreetMap contributors"
         }).addTo(map);
 
-        incidentsData.forEach(incident => {
-            if (incident.lat && incident.lng) {
-                const marker = L.marker([incident.lat, incident.lng]).addTo(map);
+        const clusterLayer = L.layerGroup().addTo(map);
+        const escapeHtml = (value) => String(value ?? "").replace(/[&<>"']/g, (c) => `&#${c.charCodeAt(0)};`);
+        let pendingClusters = null;
+
+        const clusterMarker = (cluster) => {
+            if (cluster.count === 1) {
+                const marker = L.marker([cluster.lat, cluster.lng]);
                 marker.bindPopup(`
-                    <b>${incident.user_email}</b><br>
-                    📍 Lat: ${incident.lat}, Lng: ${incident.lng}<br>
-                    ⚡ Accel: ${incident.accel_mag.toFixed(2)}<br>
-                    🚀 Speed: ${incident.speed}
+                    <b>${escapeHtml(cluster.user_email)}</b><br>
+                    📍 Lat: ${cluster.lat}, Lng: ${cluster.lng}<br>
+                    ⚡ Accel: ${Number(cluster.accel_mag || 0).toFixed(2)}<br>
+                    🚀 Speed: ${escapeHtml(cluster.speed)}<br>
+                    <a href="/case/${encodeURIComponent(cluster.id)}">🔍 View Details</a>
                 `);
+                return marker;
             }
-        });
+            const size = Math.round(28 + 8 * Math.log10(cluster.count));
+            const marker = L.marker([cluster.lat, cluster.lng], {
+                icon: L.divIcon({
+                    className: "incident-cluster",
+                    html: `<span>${cluster.count}</span>`,
+                    iconSize: [size, size]
+                })
+            });
+            marker.on("click", () => map.setView([cluster.lat, cluster.lng], Math.min(map.getZoom() + 2, 19)));
+            return marker;
+        };
+
+        const loadClusters = async () => {
+            if (pendingClusters) pendingClusters.abort();
+            pendingClusters = new AbortController();
+            const params = new URLSearchParams({
+                bbox: map.getBounds().toBBoxString(),
+                zoom: map.getZoom()
+            });
+            try {
+                const response = await fetch(`/api/map/clusters?${params}`, { signal: pendingClusters.signal });
+                const data = await response.json();
+                if (!data.success) return;
+                clusterLayer.clearLayers();
+                data.clusters.forEach(cluster => clusterLayer.addLayer(clusterMarker(cluster)));
+            } catch (error) {
+                if (error.name !== "AbortError") console.error("Loading map clusters failed:", error);
+            }
+        };
+
+        map.on("moveend", loadClusters);
+        loadClusters();
+
+        // Live fleet positions; /ambulances answers 304 until a GPS flush moves something
+        const fleetLayer = L.layerGroup().addTo(map);
+        const loadFleet = async () => {
+            try {
+                const response = await fetch("/ambulances");
+                const data = await response.json();
+                if (!data.success) return;
+                fleetLayer.clearLayers();
+                data.ambulances.filter(amb => amb.position).forEach(amb => {
+                    L.circleMarker([amb.position.lat, amb.position.lng], {
+                        radius: 7,
+                        color: "#0d6efd",
+                        fillColor: amb.status === "available" ? "#0d6efd" : "#ffc107",
+                        fillOpacity: 0.9
+                    }).bindPopup(`
+                        🚑 <b>${escapeHtml(amb.vehicle_number)}</b><br>
+                        ${escapeHtml(amb.driver_name)} (${escapeHtml(amb.status)})<br>
+                        🕒 ${escapeHtml(amb.position.recorded_at)}
+                    `).addTo(fleetLayer);
+                });
+            } catch (error) {
+                console.error("Loading ambulance positions failed:", error);
+            }
+        };
+        loadFleet();
+        setInterval(loadFleet, 5000);
     }
 
     // ===== Profile Editing =====
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+import mongomock
+
+from clustering import Grid, assign_groups, settle_groups
+
+GRID = Grid(radius_m=150, window_s=120)
+BOUNDARY = datetime(2026, 10, 19, 10, 2)  # a multiple of the 120 s window
+
+
+def report(seconds, lat=14.4663, lng=75.9219):
+    return {"lat": lat, "lng": lng, "metadata": {"created_at": BOUNDARY + timedelta(seconds=seconds)}}
+
+
+def test_out_of_order_across_batches_joins_the_later_report():
+    collection = mongomock.MongoClient().db.incidents
+    later = report(5)
+    assign_groups(collection, [later], GRID)
+    collection.insert_one(later)
+
+    earlier = report(-5)
+    joined = assign_groups(collection, [earlier], GRID)
+
+    assert earlier["group_id"] == later["group_id"]
+    assert earlier["group_primary"] is False
+    assert joined == {later["group_id"]: 1}
+
+
+def test_out_of_order_within_a_batch_makes_the_earliest_report_primary():
+    later, earlier = report(5), report(-5)
+    joined = assign_groups(mongomock.MongoClient().db.incidents, [later, earlier], GRID)
+
+    assert earlier["group_primary"] is True and earlier["report_count"] == 2
+    assert later["group_id"] == earlier["group_id"] and later["group_primary"] is False
+    assert joined == {}
+
+
+def test_reports_outside_the_window_stay_separate():
+    first, second = report(-100), report(100)
+    assign_groups(mongomock.MongoClient().db.incidents, [first, second], GRID)
+
+    assert first["group_id"] != second["group_id"]
+
+
+def test_settle_groups_counts_only_stored_reports():
+    collection = mongomock.MongoClient().db.incidents
+    existing = report(0)
+    assign_groups(collection, [existing], GRID)
+    collection.insert_one(existing)
+
+    joining, rejected = report(10), report(20)
+    assign_groups(collection, [joining, rejected], GRID)
+    collection.insert_one(joining)
+    orphans = settle_groups(collection, [joining, rejected], {joining["_id"]})
+
+    assert orphans == []
+    assert collection.find_one({"_id": existing["_id"]})["report_count"] == 2
+
+
+def test_settle_groups_drops_members_of_a_rejected_primary():
+    collection = mongomock.MongoClient().db.incidents
+    primary, member, other = report(0), report(10), report(20, lat=15.0)
+    assign_groups(collection, [primary, member, other], GRID)
+    collection.insert_many([member, other])
+
+    orphans = settle_groups(collection, [primary, member, other], {member["_id"], other["_id"]})
+
+    assert orphans == [member["_id"]]
+    assert [doc["_id"] for doc in collection.find()] == [other["_id"]]
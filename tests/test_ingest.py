@@ -0,0 +1,112 @@
+import math
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from ingest import insert_reports, normalize_incident, parse_timestamp
+
+NOW = datetime(2026, 10, 19, 12, 0, 0)
+
+
+def test_parse_timestamp_formats():
+    assert parse_timestamp("2026-10-19T17:30:00+05:30", NOW) == NOW
+    assert parse_timestamp("2026-10-19T12:00:00Z", NOW) == NOW
+    seconds = (NOW - datetime(1970, 1, 1)).total_seconds()
+    assert parse_timestamp(seconds, NOW) == NOW
+    assert parse_timestamp(seconds * 1000, NOW) == NOW
+    assert parse_timestamp(None, NOW) is NOW
+    assert parse_timestamp("", NOW) is NOW
+
+
+@pytest.mark.parametrize("raw", ["yesterday", [2026], True])
+def test_parse_timestamp_rejects_garbage(raw):
+    with pytest.raises(ValueError):
+        parse_timestamp(raw, NOW)
+
+
+def test_normalize_incident_fills_defaults():
+    doc, errors = normalize_incident({"lat": "14.5", "lng": 75.9}, now=NOW)
+
+    assert errors == []
+    assert doc["lat"] == 14.5 and doc["speed"] == 0.0 and doc["accel_mag"] == 0.0
+    assert doc["user_email"] == "Unknown"
+    assert doc["metadata"] == {"created_at": NOW, "ingested_at": NOW}
+
+
+@pytest.mark.parametrize("raw, message", [
+    ({"lng": 75.9}, "lat is required"),
+    ({"lat": 91, "lng": 75.9}, "lat must be between -90 and 90"),
+    ({"lat": 14.5, "lng": 75.9, "speed": -1}, "speed must be at least 0"),
+    ({"lat": 14.5, "lng": 75.9, "accel_mag": "nan"}, "accel_mag must be finite"),
+    ({"lat": 14.5, "lng": 75.9, "speed": True}, "speed must be a number"),
+    ({"lat": 14.5, "lng": 75.9, "metadata": "gps"}, "metadata must be an object"),
+    ({"lat": 14.5, "lng": 75.9, "created_at": "soon"}, "created_at must be an ISO-8601 string or epoch timestamp"),
+])
+def test_normalize_incident_errors(raw, message):
+    doc, errors = normalize_incident(raw, now=NOW)
+
+    assert doc is None
+    assert message in errors
+
+
+def test_normalize_incident_rejects_created_at_outside_the_window():
+    _, errors = normalize_incident({"lat": 14.5, "lng": 75.9, "metadata": {"created_at": 0}}, now=NOW)
+    assert any("seconds old" in e for e in errors)
+
+    future = (NOW + timedelta(hours=1)).isoformat()
+    _, errors = normalize_incident({"lat": 14.5, "lng": 75.9, "created_at": future}, now=NOW)
+    assert errors == ["created_at is in the future"]
+
+
+def test_normalize_incident_clamps_small_clock_skew():
+    ahead = (NOW + timedelta(seconds=30)).isoformat()
+    doc, errors = normalize_incident({"lat": 14.5, "lng": 75.9, "created_at": ahead}, now=NOW)
+
+    assert errors == []
+    assert doc["metadata"]["created_at"] == NOW
+
+
+def test_normalize_incident_backfill_accepts_old_rows():
+    doc, errors = normalize_incident({"metadata": {"created_at": datetime(2025, 1, 1)}}, now=NOW,
+                                     defaults={"lat": 14.4663, "lng": 75.9219}, max_age_s=math.inf)
+
+    assert errors == []
+    assert doc["lat"] == 14.4663 and doc["metadata"]["created_at"] == datetime(2025, 1, 1)
+
+
+def test_insert_reports_maps_duplicates_to_batch_indexes():
+    collection = mongomock.MongoClient().db.incidents
+    collection.create_index("report_id", unique=True, sparse=True)
+    collection.insert_one({"report_id": "taken"})
+    docs = [{"_id": ObjectId(), "report_id": "fresh"}, {"_id": ObjectId(), "report_id": "taken"},
+            {"_id": ObjectId()}]
+
+    inserted, failures = insert_reports(collection, docs, [4, 7, 9])
+
+    assert inserted == {4: docs[0]["_id"], 9: docs[2]["_id"]}
+    assert failures == [{"index": 7, "errors": ["duplicate report_id"]}]
+
+
+class RejectingCollection:
+    def __init__(self, write_errors):
+        self.write_errors = write_errors
+
+    def insert_many(self, docs, ordered):
+        raise BulkWriteError({"writeErrors": self.write_errors})
+
+
+def test_insert_reports_keeps_other_write_errors():
+    docs = [{"_id": ObjectId()}, {"_id": ObjectId()}]
+    collection = RejectingCollection([{"index": 0, "code": 121, "errmsg": "Document failed validation"}])
+
+    inserted, failures = insert_reports(collection, docs, [2, 3])
+
+    assert inserted == {3: docs[1]["_id"]}
+    assert failures == [{"index": 2, "errors": ["Document failed validation"]}]
+
+
+def test_insert_reports_empty_batch():
+    assert insert_reports(RejectingCollection([]), [], []) == ({}, [])
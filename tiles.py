@@ -0,0 +1,131 @@
+"""
+Server-side clustering for the dashboard's Leaflet map.
+
+The map asks for a bounding box at a zoom level and gets back grid buckets
+(count and centroid) instead of one marker per incident. Buckets are Web
+Mercator cells, MAP_CELLS_PER_TILE per map tile edge, so a cluster covers
+about the same number of screen pixels at every zoom.
+
+Each worker keeps one snapshot of the open incidents' coordinates and the
+buckets built from it per zoom level, tagged with the version it was read at:
+the global incidents stamp (see versions.py) plus the newest incident id.
+Under steady ingest that version moves with every batch, so a newer version
+only triggers a rebuild once the snapshot is MAP_SNAPSHOT_MIN_AGE_S old.
+One request rebuilds, outside the lock, while the others keep serving the
+previous snapshot; the route's ETag is the served snapshot's version, so a
+client never caches older clusters under a newer tag.
+"""
+import math
+import threading
+import time
+
+import numpy as np
+
+import config
+from clustering import PRIMARY_FILTER
+
+MAX_ZOOM = 19
+MAX_LATITUDE = 85.0511287798  # Web Mercator limit
+POINT_FIELDS = ("user_email", "speed", "accel_mag")
+
+
+def parse_bbox(raw):
+    """Leaflet's toBBoxString() ("west,south,east,north") → tuple of floats, or None."""
+    try:
+        west, south, east, north = (float(value) for value in (raw or "").split(","))
+    except ValueError:
+        return None
+    if not all(map(math.isfinite, (west, south, east, north))) or west > east or south > north:
+        return None
+    return max(west, -180.0), max(south, -MAX_LATITUDE), min(east, 180.0), min(north, MAX_LATITUDE)
+
+
+def cell_xy(lat, lng, zoom):
+    """Grid column/row arrays for coordinates at `zoom` (rows grow southwards, like tiles)."""
+    n = (2 ** zoom) * config.MAP_CELLS_PER_TILE
+    lat = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    x = np.floor((np.asarray(lng, dtype=float) + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1).astype(np.int64), np.clip(y, 0, n - 1).astype(np.int64)
+
+
+class Snapshot:
+    """Coordinates of every open incident group plus the per-zoom buckets built from them."""
+
+    def __init__(self, docs, version=None):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.lat = np.array([doc["lat"] for doc in docs], dtype=float)
+        self.lng = np.array([doc["lng"] for doc in docs], dtype=float)
+        self.points = [{"id": str(doc["_id"]), **{f: doc.get(f) for f in POINT_FIELDS}} for doc in docs]
+        self.zooms = {}
+
+    def buckets(self, zoom):
+        if zoom not in self.zooms:
+            self.zooms[zoom] = self._aggregate(zoom)
+        return self.zooms[zoom]
+
+    def _aggregate(self, zoom):
+        if not len(self.lat):
+            empty = np.empty(0, dtype=np.int64)
+            return {"x": empty, "y": empty, "count": empty, "lat": np.empty(0), "lng": np.empty(0), "first": empty}
+        x, y = cell_xy(self.lat, self.lng, zoom)
+        keys = x * ((2 ** zoom) * config.MAP_CELLS_PER_TILE) + y
+        _, first, inverse, counts = np.unique(keys, return_index=True, return_inverse=True, return_counts=True)
+        return {
+            "x": x[first],
+            "y": y[first],
+            "count": counts,
+            "lat": np.bincount(inverse, weights=self.lat) / counts,
+            "lng": np.bincount(inverse, weights=self.lng) / counts,
+            "first": first,
+        }
+
+    def clusters(self, bbox, zoom):
+        """Buckets whose cell overlaps `bbox`; single-incident buckets carry the incident itself."""
+        west, south, east, north = bbox
+        (x0, x1), (y1, y0) = cell_xy([south, north], [west, east], zoom)
+        b = self.buckets(zoom)
+        visible = np.nonzero((b["x"] >= x0) & (b["x"] <= x1) & (b["y"] >= y0) & (b["y"] <= y1))[0]
+        result = []
+        for i in visible:
+            count = int(b["count"][i])
+            if count == 1:
+                point = int(b["first"][i])
+                result.append({"lat": float(self.lat[point]), "lng": float(self.lng[point]), "count": 1,
+                               **self.points[point]})
+            else:
+                result.append({"lat": round(float(b["lat"][i]), 6), "lng": round(float(b["lng"][i]), 6),
+                               "count": count})
+        return result
+
+
+class ClusterCache:
+    """Per-process Snapshot, rebuilt at most every MAP_SNAPSHOT_MIN_AGE_S when the incidents version moves."""
+
+    def __init__(self, min_age=None):
+        self.min_age = config.MAP_SNAPSHOT_MIN_AGE_S if min_age is None else min_age
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._rebuilding = False
+
+    def snapshot(self, collection, version):
+        """The snapshot to serve for `version`: rebuilt if due, else the current one (possibly older)."""
+        with self._lock:
+            current = self._snapshot
+            due = current is None or (current.version != version and not self._rebuilding
+                                      and time.monotonic() - current.built_at >= self.min_age)
+            if not due:
+                return current
+            self._rebuilding = True
+        try:
+            query = {**PRIMARY_FILTER, "lat": {"$type": "number"}, "lng": {"$type": "number"}}
+            fields = {"lat": 1, "lng": 1, **{f: 1 for f in POINT_FIELDS}}
+            fresh = Snapshot(list(collection.find(query, fields)), version)
+        except Exception:
+            with self._lock:
+                self._rebuilding = False
+            raise
+        with self._lock:
+            self._snapshot, self._rebuilding = fresh, False
+        return fresh
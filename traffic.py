@@ -0,0 +1,107 @@
+"""
+Traffic capture for load replay (see bench/replay.py).
+
+With RECORD_TRAFFIC_PATH set, every request appends one JSON line:
+arrival time, method, URL rule, path, a hashed session id, response status,
+duration and the *shape* of the body (field names and types; values only for
+the enum-like fields in SAFE_VALUE_FIELDS, so no PII or passwords are written).
+Lines are written by a background thread, never on the request thread, in
+whole-line O_APPEND writes so several gunicorn workers can share one file.
+"""
+import atexit
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+
+from flask import current_app, g, request
+
+import config
+from process_local import ProcessLocal
+
+SAFE_VALUE_FIELDS = frozenset({"status"})
+SKIPPED_ENDPOINTS = frozenset({"static", "assets", "metrics"})
+_STOP = object()
+
+
+def body_shape(req):
+    """{field: type} of a JSON or form body; enum-like fields keep their value."""
+    data = req.get_json(silent=True) if req.is_json else None
+    if isinstance(data, dict):
+        return {k: (v if k in SAFE_VALUE_FIELDS and isinstance(v, str) else type(v).__name__)
+                for k, v in data.items()}
+    if isinstance(data, list):
+        return {"[]": len(data)}
+    if req.form:
+        return {k: "str" for k in req.form}
+    return None
+
+
+class TrafficRecorder:
+    def __init__(self, path=None):
+        self.path = path or config.RECORD_TRAFFIC_PATH
+        self._writer = ProcessLocal(self._start_writer)
+
+    def init_app(self, app):
+        if not self.path:
+            return
+        app.extensions["traffic_recorder"] = self
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        atexit.register(self.close)
+
+    def _start_writer(self):
+        lines = queue.SimpleQueue()
+        thread = threading.Thread(target=self._write_loop, args=(lines,), name="traffic-recorder", daemon=True)
+        thread.start()
+        return lines, thread
+
+    def _write_loop(self, pending):
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            while True:
+                lines = [pending.get()]
+                while not pending.empty() and len(lines) < 512:
+                    lines.append(pending.get())
+                stop = lines[-1] is _STOP
+                if stop:
+                    lines.pop()
+                if lines:
+                    os.write(fd, "".join(lines).encode("utf-8"))
+                if stop:
+                    return
+        finally:
+            os.close(fd)
+
+    def _before_request(self):
+        g._traffic_started = time.perf_counter()
+
+    def _after_request(self, response):
+        started = g.pop("_traffic_started", None)
+        if started is None or request.endpoint in SKIPPED_ENDPOINTS:
+            return response
+        cookie = request.cookies.get(current_app.config["SESSION_COOKIE_NAME"])
+        record = {
+            "t": round(time.time(), 4),
+            "pid": os.getpid(),
+            "method": request.method,
+            "endpoint": request.endpoint,
+            "rule": request.url_rule.rule if request.url_rule else None,
+            "path": request.full_path.rstrip("?"),
+            "session": hashlib.sha1(cookie.encode()).hexdigest()[:12] if cookie else None,
+            "body": body_shape(request),
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+        pending, _ = self._writer.get()
+        pending.put(json.dumps(record) + "\n")
+        return response
+
+    def close(self):
+        writer = self._writer.pop()
+        if writer is not None:
+            pending, thread = writer
+            pending.put(_STOP)
+            thread.join(timeout=5)
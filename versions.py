@@ -0,0 +1,112 @@
+"""
+Version stamps for conditional GETs (ETag / 304).
+
+Every mutating route bumps a counter per affected hospital (plus a global
+one for changes everybody's dashboard shows, such as case acceptance).
+Polling endpoints build a strong ETag from those counters, so an unchanged
+poll costs one small lookup on `version_stamps` and skips the real queries.
+"""
+import functools
+import hashlib
+
+from flask import current_app, g, make_response, request, session
+
+from compression import ETAG_SUFFIXES
+COLLECTION = "version_stamps"
+GLOBAL_SCOPE = "*incidents*"
+CACHE_CONTROL = "private, no-cache"
+
+
+def hospital_scope(hospital_name):
+    return f"hospital:{hospital_name}"
+
+
+def position_scope(hospital_name):
+    """Bumped by the GPS flush (positions.py), kept apart so it doesn't invalidate the dashboard."""
+    return f"positions:{hospital_name}"
+
+
+def bump_scopes(hospitals=(), incidents=False, positions=False):
+    """Scope ids to bump after a write touching `hospitals` (and the shared incident feed / their fleet positions)."""
+    scopes = {hospital_scope(h) for h in hospitals if h}
+    if incidents:
+        scopes.add(GLOBAL_SCOPE)
+    if positions:
+        scopes.update(position_scope(h) for h in hospitals if h)
+    return sorted(scopes)
+
+
+def stamps_filter(scopes):
+    return {"_id": {"$in": list(scopes)}}
+
+
+def make_etag(kind, stamps, *parts):
+    """Strong ETag from the view name, the stamp values and any per-user parts (same in both apps)."""
+    digest = hashlib.sha1(kind.encode())
+    for scope in sorted(stamps):
+        digest.update(f"|{scope}={stamps[scope]}".encode())
+    for part in parts:
+        digest.update(f"|{part}".encode())
+    return digest.hexdigest()[:32]
+
+
+# -----------------------------
+# Flask helpers (sync app)
+# -----------------------------
+def _db():
+    return current_app.extensions["mongo"].db
+
+
+def bump_stamps(db, scopes):
+    """$inc each stamp; usable outside a request (the GPS flush thread)."""
+    for scope in scopes:
+        db[COLLECTION].update_one({"_id": scope}, {"$inc": {"v": 1}}, upsert=True)
+
+
+def bump(hospitals=(), incidents=False):
+    """Invalidate cached responses for `hospitals` (and every dashboard when `incidents`)."""
+    bump_stamps(_db(), bump_scopes(hospitals, incidents))
+
+
+def read_stamps(scopes):
+    found = {doc["_id"]: doc.get("v", 0) for doc in _db()[COLLECTION].find(stamps_filter(scopes))}
+    return {scope: found.get(scope, 0) for scope in scopes}
+
+
+def etag_matches(tag):
+    """If-None-Match check that also accepts the compressed variants of `tag`."""
+    return any(request.if_none_match.contains(tag + suffix) for suffix in ("",) + ETAG_SUFFIXES)
+
+
+def conditional(incidents=False, extra=None, positions=False):
+    """
+    Serve a logged-in GET view with an ETag built from the session hospital's stamp
+    (plus the global incident stamp when `incidents`, its fleet position stamp when `positions`);
+    answer 304 without calling the view when it matches.
+    `extra()` may return additional validator parts that are cheap to compute.
+    The stamps read are left on g.version_stamps for the view.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if "email" not in session:
+                return view(*args, **kwargs)
+
+            scopes = bump_scopes([session.get("hospital_name")], incidents, positions)
+            parts = [session["email"], session.get("hospital_name")]
+            if extra is not None:
+                parts.extend(extra())
+            g.version_stamps = read_stamps(scopes)
+            tag = make_etag(request.endpoint.rpartition(".")[2], g.version_stamps, *parts)
+
+            if etag_matches(tag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(tag)
+            response.headers["Cache-Control"] = CACHE_CONTROL
+            return response
+        return wrapper
+    return decorator
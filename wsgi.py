@@ -0,0 +1,11 @@
+"""
+Production entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+gunicorn imports this module in each worker after fork (preload_app is off),
+so every worker builds its own app and MongoClient.
+"""
+from app import create_app
+
+app = create_app()